@@ -1,17 +1,32 @@
+from functools import lru_cache
 from ..app.config import get_llm
 from ..app.prompts import get_prompt
 
-def generate_content(platform: str, topic: str, language: str = "es", provider: str = "groq") -> str:
-    llm = get_llm(provider=provider)
+# Instruccion especifica para la deteccion del idioma
+LANGUAGE_INSTRUCTIONS = {
+    "es": "Responde en español: ",
+    "en": "Answer in English: ",
+    "fr": "Répondez en français: ",
+    "it": "Rispondi in italiano: "
+}
+
+@lru_cache(maxsize=None)
+def _get_cached_llm(provider: str):
+    # Un cliente por proveedor, reutilizado entre peticiones
+    return get_llm(provider=provider)
+
+def _build_prompt(platform: str, topic: str, language: str) -> str:
     prompt = get_prompt(platform, topic, language)
-    # Instruccion especifica para la deteccion del idioma
-    language_instruction = {
-        "es": "Responde en español: ",
-        "en": "Answer in English: ",
-        "fr": "Répondez en français: ",
-        "it": "Rispondi in italiano: "
-    }.get(language, "Responde en español: ")
+    language_instruction = LANGUAGE_INSTRUCTIONS.get(language, LANGUAGE_INSTRUCTIONS["es"])
+    return language_instruction + prompt
 
-    full_prompt = language_instruction + prompt
-    response = llm.invoke(full_prompt)
+def generate_content(platform: str, topic: str, language: str = "es", provider: str = "groq") -> str:
+    llm = _get_cached_llm(provider)
+    response = llm.invoke(_build_prompt(platform, topic, language))
     return response
+
+async def agenerate_content(platform: str, topic: str, language: str = "es", provider: str = "groq") -> str:
+    # Versión asíncrona: no bloquea el event loop mientras espera al LLM
+    llm = _get_cached_llm(provider)
+    responses = await llm.ainvoke([_build_prompt(platform, topic, language)])
+    return responses[0]
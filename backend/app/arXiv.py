@@ -1,32 +1,129 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import xml.etree.ElementTree as ET
+import copy
+import io
+import logging
+import multiprocessing
 import os
+import shutil
+import threading
 import time
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cachetools import TTLCache
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
-import PyPDF2
-import re
 from pathlib import Path
 from dotenv import load_dotenv
+from .pdf_text import extract_pdf_text
 
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+logger = logging.getLogger(__name__)
 
+# Recent search results, the same topics are queried repeatedly
+ARXIV_CACHE_SIZE = int(os.getenv("ARXIV_CACHE_SIZE", "1024"))
+ARXIV_CACHE_TTL = int(os.getenv("ARXIV_CACHE_TTL", "3600"))  # seconds
+_search_cache = TTLCache(maxsize=ARXIV_CACHE_SIZE, ttl=ARXIV_CACHE_TTL)
+_search_cache_lock = threading.Lock()
+
+# Minimum spacing between request starts to arXiv (seconds), per its API terms of use
+ARXIV_MIN_REQUEST_INTERVAL = float(os.getenv("ARXIV_MIN_REQUEST_INTERVAL", "1.0"))
+
+
+class _RateLimiter:
+    """Spaces request starts at least min_interval seconds apart across all threads"""
+    
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+    
+    def wait(self):
+        """Blocks until the caller may start its request"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+
+_arxiv_rate_limiter = _RateLimiter(ARXIV_MIN_REQUEST_INTERVAL)
+
+
+class _ThrottledRetry(Retry):
+    """Retry that also waits for the rate limiter, so retries (e.g. after a 429) stay spaced out"""
+    
+    def sleep(self, response=None):
+        super().sleep(response)
+        _arxiv_rate_limiter.wait()
+
+
+# Keep-alive connection pool shared by all extractors (the API creates one per request)
+arxiv_session = requests.Session()
+_arxiv_adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16,
+                             max_retries=_ThrottledRetry(total=3, backoff_factor=0.3,
+                                                         status_forcelist=[429, 500, 502, 503, 504]))
+arxiv_session.mount("http://", _arxiv_adapter)
+arxiv_session.mount("https://", _arxiv_adapter)
+
+# Worker processes for PDF text extraction, shared by all searches
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Started with "spawn": forking the server would copy its threads, torch state and open SQLite handles
+_extract_pool: Optional[ProcessPoolExecutor] = None
+_extract_pool_lock = threading.Lock()
+
+
+def start_text_extraction_pool() -> ProcessPoolExecutor:
+    """Creates the shared text extraction pool (called from the FastAPI lifespan)"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            _extract_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _extract_pool
+
+
+def shutdown_text_extraction_pool():
+    """Stops the shared text extraction pool"""
+    global _extract_pool
+    with _extract_pool_lock:
+        pool, _extract_pool = _extract_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _discard_text_extraction_pool(pool: ProcessPoolExecutor):
+    """Drops a broken pool so the next search starts a fresh one"""
+    global _extract_pool
+    with _extract_pool_lock:
+        if _extract_pool is pool:
+            _extract_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+# Concurrent PDF downloads per search; starts are still spaced by _arxiv_rate_limiter,
+# so extra workers only overlap slow transfers
+PDF_DOWNLOAD_WORKERS = 4
+
+
+@dataclass(slots=True)
 class ArxivDocument:
     """Class for representing arXiv documents"""
     
-    def __init__(self, title: str, authors: List[str], abstract: str, 
-                 arxiv_id: str, published_date: str, pdf_url: str, 
-                 categories: List[str], full_text: str = ""):
-        self.title = title
-        self.authors = authors
-        self.abstract = abstract
-        self.arxiv_id = arxiv_id
-        self.published_date = published_date
-        self.pdf_url = pdf_url
-        self.categories = categories
-        self.full_text = full_text
+    title: str
+    authors: List[str]
+    abstract: str
+    arxiv_id: str
+    published_date: str
+    pdf_url: str
+    categories: List[str]
+    full_text: str = ""
     
     def __str__(self):
         return f"arXiv:{self.arxiv_id} - {self.title}"
@@ -49,10 +146,29 @@ class ArxivDocument:
 class ArxivExtractor:
     """Class for extracting documents from arXiv"""
     
+    # Namespace-qualified Atom tags (entry fields are direct children, no descendant search needed)
+    _ATOM = "{http://www.w3.org/2005/Atom}"
+    _TAG_ENTRY = _ATOM + "entry"
+    _TAG_TITLE = _ATOM + "title"
+    _TAG_SUMMARY = _ATOM + "summary"
+    _TAG_AUTHOR = _ATOM + "author"
+    _TAG_NAME = _ATOM + "name"
+    _TAG_ID = _ATOM + "id"
+    _TAG_PUBLISHED = _ATOM + "published"
+    _TAG_PRIMARY_CATEGORY = "{http://arxiv.org/schemas/atom}primary_category"
+    
     def __init__(self):
         self.base_url = "http://export.arxiv.org/api/query"
         self.pdf_base_url = "https://arxiv.org/pdf/"
         self.browser_base_url = "https://arxiv.org/abs/"
+        self.session = arxiv_session
+        self._ensured_dirs = set()  # Output folders already created
+    
+    def _ensure_dir(self, output_dir: str):
+        """Creates the output folder once per extractor"""
+        if output_dir not in self._ensured_dirs:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            self._ensured_dirs.add(output_dir)
         
     def search_documents(self, 
                         topic: str, 
@@ -72,6 +188,13 @@ class ArxivExtractor:
             List of ArxivDocument objects
         """
         
+        cache_key = (topic, max_results, days_back, tuple(categories) if categories else None)
+        with _search_cache_lock:
+            cached = _search_cache.get(cache_key)
+        if cached is not None:
+            # Copies, callers fill in full_text
+            return [copy.copy(doc) for doc in cached]
+        
         # Form query
         query_params = {
             'search_query': f'all:"{topic}"',
@@ -94,19 +217,21 @@ class ArxivExtractor:
         
         try:
             # Execute request to arXiv API
-            response = requests.get(self.base_url, params=query_params)
+            response = self.session.get(self.base_url, params=query_params)
             response.raise_for_status()
             
-            # Parse XML response
-            root = ET.fromstring(response.content)
-            
-            # Extract documents
+            # Parse XML response incrementally, freeing each entry once it is parsed
             documents = []
-            for entry in root.findall('.//{http://www.w3.org/2005/Atom}entry'):
-                doc = self._parse_entry(entry)
+            for _, elem in ET.iterparse(io.BytesIO(response.content), events=("end",)):
+                if elem.tag != self._TAG_ENTRY:
+                    continue
+                doc = self._parse_entry(elem)
                 if doc:
                     documents.append(doc)
+                elem.clear()
             
+            with _search_cache_lock:
+                _search_cache[cache_key] = [copy.copy(doc) for doc in documents]
             return documents
             
         except requests.RequestException as e:
@@ -120,25 +245,25 @@ class ArxivExtractor:
         """Parses XML entry element into ArxivDocument object"""
         try:
             # Extract basic information
-            title = entry.find('.//{http://www.w3.org/2005/Atom}title').text.strip()
-            summary = entry.find('.//{http://www.w3.org/2005/Atom}summary').text.strip()
+            title = entry.find(self._TAG_TITLE).text.strip()
+            summary = entry.find(self._TAG_SUMMARY).text.strip()
             
             # Extract authors
             authors = []
-            for author in entry.findall('.//{http://www.w3.org/2005/Atom}author'):
-                name = author.find('.//{http://www.w3.org/2005/Atom}name').text.strip()
+            for author in entry.iterfind(self._TAG_AUTHOR):
+                name = author.find(self._TAG_NAME).text.strip()
                 authors.append(name)
             
             # Extract ID and date
-            id_elem = entry.find('.//{http://www.w3.org/2005/Atom}id')
+            id_elem = entry.find(self._TAG_ID)
             arxiv_id = id_elem.text.split('/')[-1] if id_elem is not None else ""
             
-            published = entry.find('.//{http://www.w3.org/2005/Atom}published')
+            published = entry.find(self._TAG_PUBLISHED)
             published_date = published.text[:10] if published is not None else ""
             
             # Extract categories
             categories = []
-            for category in entry.findall('.//{http://arxiv.org/schemas/atom}primary_category'):
+            for category in entry.iterfind(self._TAG_PRIMARY_CATEGORY):
                 cat = category.get('term')
                 if cat:
                     categories.append(cat)
@@ -173,22 +298,22 @@ class ArxivExtractor:
         """
         try:
             # Create folder if it doesn't exist
-            os.makedirs(output_dir, exist_ok=True)
+            self._ensure_dir(output_dir)
             
             # URL for downloading PDF
             pdf_url = f"{self.pdf_base_url}{arxiv_id}.pdf"
             
-            # Download file
-            response = requests.get(pdf_url, stream=True)
-            response.raise_for_status()
-            
             # Save file
             filename = f"{arxiv_id}.pdf"
             filepath = os.path.join(output_dir, filename)
             
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            # Download file, copying the raw stream to disk in 1 MiB blocks
+            _arxiv_rate_limiter.wait()
+            with self.session.get(pdf_url, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                with open(filepath, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, length=1024 * 1024)
             
             print(f"PDF downloaded: {filepath}")
             return filepath
@@ -211,45 +336,7 @@ class ArxivExtractor:
         Returns:
             Extracted text
         """
-        try:
-            # Use PyPDF2 for text extraction
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-                return self._clean_text(text)
-                    
-        except Exception as e:
-            print(f"Error extracting text from PDF {pdf_path}: {e}")
-            return ""
-    
-    def _clean_text(self, text: str) -> str:
-        """
-        Cleans extracted text from extra characters and formatting
-        
-        Args:
-            text: Original text
-            
-        Returns:
-            Cleaned text
-        """
-        # Remove extra spaces and line breaks
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove arXiv special characters
-        text = re.sub(r'arXiv:\d+\.\d+', '', text)
-        
-        # Remove page numbers
-        text = re.sub(r'\b\d+\s*$', '', text, flags=re.MULTILINE)
-        
-        # Remove repeating characters
-        text = re.sub(r'([.!?])\1+', r'\1', text)
-        
-        # Remove extra spaces at beginning and end
-        text = text.strip()
-        
-        return text
+        return extract_pdf_text(pdf_path)
     
     def extract_text_from_pdf_by_id(self, arxiv_id: str, pdf_dir: str = "downloads") -> str:
         """
@@ -270,6 +357,22 @@ class ArxivExtractor:
         
         return self.extract_text_from_pdf(pdf_path)
     
+    def _extract_texts(self, pdf_paths: List[str]) -> List[str]:
+        """Extracts text from several PDF files in the shared worker process pool"""
+        if len(pdf_paths) < 2:
+            return [extract_pdf_text(path) for path in pdf_paths]
+        
+        pool = None
+        try:
+            pool = start_text_extraction_pool()
+            return list(pool.map(extract_pdf_text, pdf_paths))
+        except (BrokenProcessPool, OSError) as e:
+            logger.warning("Process pool unavailable, extracting text in threads: %s", e)
+            if pool is not None:
+                _discard_text_extraction_pool(pool)
+            with ThreadPoolExecutor(max_workers=min(len(pdf_paths), PDF_EXTRACT_WORKERS)) as executor:
+                return list(executor.map(extract_pdf_text, pdf_paths))
+    
     def search_and_download(self, 
                            topic: str, 
                            max_results: int = 5,
@@ -304,41 +407,35 @@ class ArxivExtractor:
         downloaded_files = []
         if download_pdfs:
             print("Downloading PDF files...")
-            for doc in documents:
-                filepath = self.download_pdf(doc.arxiv_id, output_dir)
+            self._ensure_dir(output_dir)
+            with ThreadPoolExecutor(max_workers=PDF_DOWNLOAD_WORKERS) as executor:
+                filepaths = list(executor.map(lambda doc: self.download_pdf(doc.arxiv_id, output_dir), documents))
+            for doc, filepath in zip(documents, filepaths):
                 if filepath:
                     downloaded_files.append({
                         'arxiv_id': doc.arxiv_id,
                         'filepath': filepath,
                         'browser_url': self.get_browser_url(doc.arxiv_id)
                     })
-                time.sleep(1)  # Small delay between requests
         
         # Extract text from PDF if required
         if extract_text and download_pdfs:
             print("Extracting full text from PDF...")
-            for doc in documents:
-                if any(f['arxiv_id'] == doc.arxiv_id for f in downloaded_files):
-                    full_text = self.extract_text_from_pdf_by_id(doc.arxiv_id, output_dir)
-                    doc.full_text = full_text
-                    print(f"Extracted text from {doc.arxiv_id} ({len(full_text)} characters)")
+            downloaded_paths = {f['arxiv_id']: f['filepath'] for f in downloaded_files}
+            to_extract = [doc for doc in documents if doc.arxiv_id in downloaded_paths]
+            texts = self._extract_texts([downloaded_paths[doc.arxiv_id] for doc in to_extract])
+            for doc, full_text in zip(to_extract, texts):
+                doc.full_text = full_text
+                print(f"Extracted text from {doc.arxiv_id} ({len(full_text)} characters)")
         
-        # Form result
-        result = {
+        # Form result (to_dict already includes the browser link)
+        return {
             "topic": topic,
             "search_date": datetime.now().isoformat(),
             "total_found": len(documents),
-            "documents": [],
+            "documents": [doc.to_dict() for doc in documents],
             "downloaded_files": downloaded_files
         }
-        
-        # Convert documents to dictionaries and add browser links
-        for doc in documents:
-            doc_dict = doc.to_dict()
-            doc_dict['browser_url'] = self.get_browser_url(doc.arxiv_id)
-            result["documents"].append(doc_dict)
-        
-        return result
 
 
 # Usage example
@@ -1,10 +1,37 @@
+import asyncio
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import logging
+from typing import List, Optional
+from .llm_cache import llm_cache
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Maximum number of Groq requests in flight for ainvoke
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+
+# Shared async HTTP client, opened and closed by the FastAPI lifespan
+_async_client: Optional[httpx.AsyncClient] = None
+
+def open_async_client() -> httpx.AsyncClient:
+    """Creates the shared async HTTP client used by ainvoke"""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(http2=True, timeout=60)
+    return _async_client
+
+async def close_async_client():
+    """Closes the shared async HTTP client"""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
 class GroqLLM:
     def __init__(self, api_key: str, model: str = "gemma2-9b-it"):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
@@ -12,12 +39,27 @@ class GroqLLM:
             raise ValueError("GROQ_API_KEY not found in environment variables")
         self.model = model
         self.endpoint = "https://api.groq.com/openai/v1/chat/completions"
-
-    def invoke(self, prompt: str) -> str:
-        headers = {
+        
+        # Keep-alive connection reused across calls, retrying rate limits and transient server errors
+        self.session = requests.Session()
+        self.session.headers.update({
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
-        }
+        })
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=8, pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504],
+                              allowed_methods=frozenset({"POST"}))))
+
+    def invoke(self, prompt: str) -> str:
+        # Requests use Groq's default (sampling) temperature, so responses are only reused when opted in
+        use_cache = llm_cache.cacheable(None)
+        cache_key = llm_cache.make_key("groq", self.model, prompt)
+        cached = llm_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            logger.debug(f"Groq response served from cache for model: {self.model}")
+            return cached
+        
         data = {
             "model": self.model,
             "messages": [{"role": "user", "content": prompt}]
@@ -25,16 +67,19 @@ class GroqLLM:
         
         try:
             logger.debug(f"Sending request to Groq API with model: {self.model}")
-            response = requests.post(self.endpoint, headers=headers, json=data)
+            response = self.session.post(self.endpoint, data=orjson.dumps(data), timeout=(3.05, 60))
             response.raise_for_status()
             
-            json_response = response.json()
+            json_response = orjson.loads(response.content)
             logger.debug(f"Groq API response: {json_response}")
             
             if "choices" not in json_response:
                 raise ValueError(f"Unexpected API response format: {json_response}")
                 
-            return json_response["choices"][0]["message"]["content"]
+            content = json_response["choices"][0]["message"]["content"]
+            if use_cache:
+                llm_cache.set(cache_key, content)
+            return content
             
         except requests.exceptions.RequestException as e:
             logger.error(f"HTTP error occurred: {str(e)}")
@@ -44,6 +89,46 @@ class GroqLLM:
             logger.error(f"Error processing API response: {str(e)}")
             raise
 
+    async def ainvoke(self, prompts: List[str]) -> List[str]:
+        """Answers several prompts with concurrent requests (results in the same order)"""
+        semaphore = asyncio.Semaphore(GROQ_MAX_CONCURRENCY)
+        headers = dict(self.session.headers)
+        use_cache = llm_cache.cacheable(None)  # Same default-temperature requests as invoke
+
+        async def complete(client: httpx.AsyncClient, prompt: str) -> str:
+            cache_key = llm_cache.make_key("groq", self.model, prompt)
+            cached = llm_cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                return cached
+
+            data = {
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}]
+            }
+            async with semaphore:
+                try:
+                    response = await client.post(self.endpoint, headers=headers, content=orjson.dumps(data))
+                    response.raise_for_status()
+                except httpx.HTTPError as e:
+                    logger.error(f"HTTP error occurred: {str(e)}")
+                    raise RuntimeError(f"Error calling Groq API: {str(e)}")
+
+            json_response = orjson.loads(response.content)
+            if "choices" not in json_response:
+                raise ValueError(f"Unexpected API response format: {json_response}")
+
+            content = json_response["choices"][0]["message"]["content"]
+            if use_cache:
+                llm_cache.set(cache_key, content)
+            return content
+
+        if _async_client is not None:
+            return await asyncio.gather(*(complete(_async_client, prompt) for prompt in prompts))
+
+        # Outside the app (scripts), use a client for this batch only
+        async with httpx.AsyncClient(http2=True, timeout=60) as client:
+            return await asyncio.gather(*(complete(client, prompt) for prompt in prompts))
+
 class SimpleLLM:
     """Простой LLM для тестирования без внешних зависимостей"""
     
@@ -53,6 +138,10 @@ class SimpleLLM:
     def invoke(self, prompt: str) -> str:
         """Простая заглушка для LLM"""
         return f"Это ответ от {self.model_name} на запрос: {prompt[:100]}..."
+    
+    async def ainvoke(self, prompts: List[str]) -> List[str]:
+        """Заглушка для пакетного вызова"""
+        return [self.invoke(prompt) for prompt in prompts]
 
 def get_llm(model_name: str = "llama3", provider: str = "groq"):
     """Factory function для создания LLM"""
@@ -0,0 +1,71 @@
+"""
+Persistent cache for fragment embeddings
+Stores vectors in SQLite keyed on (content hash, model) so re-ingested fragments skip the encoder
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable
+import numpy as np
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite3")
+
+# Keeps IN (...) lookups under SQLite's bound-parameter limit
+_LOOKUP_CHUNK = 900
+
+
+class EmbeddingCache:
+    """SQLite-backed float32 vector cache keyed on a hash of the fragment text"""
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "hash TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (hash, model))"
+            )
+
+    @staticmethod
+    def make_key(text: str) -> str:
+        """Builds the cache key for a fragment"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached vectors for the given keys (misses are left out)"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *chunk],
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def set_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        """Stores vectors for the given keys"""
+        rows = [
+            (key, model, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in vectors.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (hash, model, vector) VALUES (?, ?, ?)", rows
+            )
+
+    def clear(self):
+        """Drops all cached vectors"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM embeddings")
@@ -0,0 +1,53 @@
+"""
+Exact-match cache for LLM responses
+Only greedy (temperature 0) calls are cached unless LLM_CACHE_SAMPLED opts sampled calls in
+"""
+
+import hashlib
+import os
+import threading
+from typing import Optional
+from cachetools import TTLCache
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "300"))  # seconds
+# Reuse sampled (temperature > 0) responses too; repeated requests then get the same text until the TTL expires
+LLM_CACHE_SAMPLED = os.getenv("LLM_CACHE_SAMPLED", "false").lower() == "true"
+
+
+class LLMResponseCache:
+    """In-memory TTL cache keyed on a hash of (provider, model, parameters, prompt)"""
+
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, ttl: int = LLM_CACHE_TTL, cache_sampled: bool = LLM_CACHE_SAMPLED):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.cache_sampled = cache_sampled
+
+    def cacheable(self, temperature: Optional[float]) -> bool:
+        """Whether a response at this temperature may be reused (None = provider default, i.e. sampled)"""
+        return temperature == 0 or self.cache_sampled
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Builds a cache key from the request parts"""
+        raw = "|".join(str(part) for part in parts)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str):
+        """Returns the cached response or None"""
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value):
+        """Stores a response"""
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        """Drops all cached responses"""
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared cache instance
+llm_cache = LLMResponseCache()
@@ -4,39 +4,128 @@ Simple HuggingFace embedding without LlamaIndex (enhanced with fragmentation)
 """
 
 import os
+import hashlib
 import pickle
+import threading
+from functools import lru_cache
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
 import logging
+from .vector_store_config import detect_device
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Batch size for fragment encoding
+ENCODE_BATCH_SIZE = 64
+
+# int8 storage of normalized embeddings: components lie in [-1, 1], stored as round(x * 127)
+INT8_SCALE = 127.0
+
+# Rows of int8 codes dequantized at a time when scoring (bounds the temporary float32 copy)
+INT8_SCORE_BLOCK_ROWS = 16384
+
+# Number of query embeddings kept in memory
+QUERY_CACHE_SIZE = 4096
+
+# Preferred fragment break points, best first: sentence end, paragraph, line, word
+FRAGMENT_BREAK_CHARS = ('. ', '\n\n', '\n', ' ')
+
+def _fragment_features(fragments):
+    """Per-fragment arrays used for score enhancement: text lengths and first-fragment flags"""
+    lengths = np.array([frag.get('fragment_length', 0) for frag in fragments], dtype=np.int32)
+    first_fragment = np.array([frag.get('fragment_index', 0) == 0 for frag in fragments], dtype=bool)
+    return lengths, first_fragment
+
+class _FragmentIndex:
+    """Searchable state of the storage, never modified after creation (writers swap in a new one)"""
+    
+    def __init__(self, documents=None, fragments=None, emb_matrix=None,
+                 term_counts=None, tfidf_transformer=None, tfidf_matrix=None, features=None):
+        self.documents = documents if documents is not None else []  # Original documents
+        self.fragments = fragments if fragments is not None else []  # Document fragments
+        self.emb_matrix = emb_matrix  # (N, D) normalized fragment embeddings (float32, or int8 codes), row i = fragment i
+        self.term_counts = term_counts  # Sparse hashed term counts of the fragments (kept to refit IDF)
+        self.tfidf_transformer = tfidf_transformer  # IDF weights fitted on term_counts
+        self.tfidf_matrix = tfidf_matrix  # L2-normalized TF-IDF rows
+        self.frag_lengths, self.first_fragment = features if features is not None else _fragment_features(self.fragments)
+
 class SimpleHuggingFaceStore:
     """Simple storage with HuggingFace embeddings (enhanced ranking with fragmentation)"""
     
     def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2", cache_dir="./huggingface_cache", 
-                 chunk_size=512, chunk_overlap=50):
-        """Initialize storage"""
+                 chunk_size=512, chunk_overlap=50, quantize_embeddings=False, persist_path=None,
+                 quantize_model=False):
+        """Initialize storage (restored from persist_path when it exists)"""
         self.model_name = model_name
         self.cache_dir = cache_dir
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.documents = []  # Original documents
-        self.fragments = []  # Document fragments
-        self.embeddings = []  # Fragment embeddings
-        self.tfidf_vectorizer = TfidfVectorizer(max_features=2000, stop_words='english', ngram_range=(1, 2))
-        self.tfidf_matrix = None
+        self.quantize_embeddings = quantize_embeddings  # Keep embeddings as int8 codes (1 byte per dimension instead of 4)
+        self.persist_path = persist_path  # Storage is saved here after every change
+        self.quantize_model = quantize_model  # int8 dynamic quantization of the encoder on CPU
+        # Stateless term hashing: only new fragments are tokenized when documents are added
+        self._term_vectorizer = HashingVectorizer(n_features=2**18, stop_words='english', ngram_range=(1, 2),
+                                                  alternate_sign=False, norm=None)
+        self._index = _FragmentIndex()
+        self._write_lock = threading.Lock()  # Serializes add_documents/clear/load; searches never wait on it
+        self._seen_keys = set()  # arXiv IDs and content hashes of stored documents
         
         # Create cache directory
         os.makedirs(cache_dir, exist_ok=True)
         
         # Load model
         logger.info(f"Loading model: {model_name}")
-        self.model = SentenceTransformer(model_name, cache_folder=cache_dir, use_auth_token=os.getenv("HUGGINGFACE_API_KEY"))
+        self._load_model()
         logger.info("Model loaded successfully")
+        
+        # Restore persisted storage
+        if persist_path and os.path.exists(persist_path):
+            self.load(persist_path)
+    
+    @property
+    def documents(self):
+        return self._index.documents
+    
+    @property
+    def fragments(self):
+        return self._index.fragments
+    
+    @property
+    def embeddings(self):
+        """(N, D) matrix of normalized fragment embeddings, int8 codes when quantized (None while empty)"""
+        return self._index.emb_matrix
+    
+    @property
+    def tfidf_matrix(self):
+        return self._index.tfidf_matrix
+    
+    def _load_model(self):
+        """Loads the embedding model for self.model_name"""
+        device = detect_device()
+        logger.info(f"Embedding device: {device}")
+        self.model = SentenceTransformer(self.model_name, cache_folder=self.cache_dir, device=device,
+                                         use_auth_token=os.getenv("HUGGINGFACE_API_KEY"))
+        
+        if self.quantize_model and self.model.device.type == "cpu":
+            # Linear layers run as int8 GEMMs (VNNI on recent CPUs)
+            import torch
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+            logger.info("Embedding model quantized to int8")
+        
+        self._reset_query_cache()
+    
+    def _reset_query_cache(self):
+        """(Re)creates the query embedding cache for the current model"""
+        self._encode_query = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._encode_query_uncached)
+    
+    def _encode_query_uncached(self, query):
+        """Encodes a query to a normalized float32 vector (read-only result, shared between cache hits)"""
+        embedding = self.model.encode(query, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32, copy=False)
+        embedding.setflags(write=False)
+        return embedding
     
     def _fragment_text(self, text, chunk_size=None, chunk_overlap=None):
         """Fragments text into chunks"""
@@ -45,28 +134,26 @@ class SimpleHuggingFaceStore:
         if chunk_overlap is None:
             chunk_overlap = self.chunk_overlap
             
-        if len(text) <= chunk_size:
+        text_length = len(text)
+        if text_length <= chunk_size:
             return [text]
         
         fragments = []
         start = 0
+        min_break_offset = chunk_size * 0.7  # Don't break too early
         
-        while start < len(text):
+        while start < text_length:
             end = start + chunk_size
             
             # If this is not the last fragment, find a good break point
-            if end < len(text):
-                # Find the nearest sentence or paragraph end
-                break_chars = ['. ', '\n\n', '\n', ' ']
-                best_break = end
-                
-                for char in break_chars:
+            if end < text_length:
+                # Find the nearest sentence or paragraph end (searches only the current window)
+                earliest_break = start + min_break_offset
+                for char in FRAGMENT_BREAK_CHARS:
                     pos = text.rfind(char, start, end)
-                    if pos > start + chunk_size * 0.7:  # Don't break too early
-                        best_break = pos + len(char)
+                    if pos > earliest_break:
+                        end = pos + len(char)
                         break
-                
-                end = best_break
             
             fragment = text[start:end].strip()
             if fragment:
@@ -74,7 +161,7 @@ class SimpleHuggingFaceStore:
             
             # Next fragment with overlap
             start = end - chunk_overlap
-            if start >= len(text):
+            if start >= text_length:
                 break
         
         return fragments
@@ -83,74 +170,123 @@ class SimpleHuggingFaceStore:
         """Adds documents to storage with fragmentation"""
         logger.info(f"Adding {len(documents)} documents")
         
-        original_count = len(self.documents)
-        
-        for doc in documents:
-            # Save original document
-            self.documents.append(doc)
-            
-            # Extract text
-            text = self._extract_text(doc)
-            if not text:
-                continue
+        with self._write_lock:
+            # Build the new state next to the current one, searches keep using the current one
+            current = self._index
+            stored_documents = list(current.documents)
+            stored_fragments = list(current.fragments)
+            new_texts = []  # Texts of the new fragments, encoded together below
+            new_keys = set()  # Keys of the documents in this batch, recorded once the batch is published
             
-            # Fragment text
-            fragments = self._fragment_text(text)
-            logger.info(f"Document '{doc.get('title', 'Unknown')}' split into {len(fragments)} fragments")
-            
-            # Create fragments with metadata
-            for i, fragment in enumerate(fragments):
-                fragment_doc = {
-                    'original_doc_index': len(self.documents) - 1,
-                    'fragment_index': i,
-                    'fragment_text': fragment,
-                    'title': doc.get('title', ''),
-                    'authors': doc.get('authors', []),
-                    'arxiv_id': doc.get('arxiv_id', ''),
-                    'published_date': doc.get('published_date', ''),
-                    'categories': doc.get('categories', []),
-                    'fragment_length': len(fragment),
-                    'total_fragments': len(fragments)
-                }
+            for doc in documents:
+                # Skip documents that are already stored (or repeated within the batch)
+                doc_keys = self._document_keys(doc)
+                if doc_keys & self._seen_keys or doc_keys & new_keys:
+                    logger.info(f"Skipping duplicate document '{doc.get('title', 'Unknown') if isinstance(doc, dict) else doc}'")
+                    continue
+                new_keys.update(doc_keys)
+                
+                # Save original document
+                stored_documents.append(doc)
+                
+                # Extract text
+                text = self._extract_text(doc)
+                if not text:
+                    continue
                 
-                self.fragments.append(fragment_doc)
+                # Fragment text
+                fragments = self._fragment_text(text)
+                logger.info(f"Document '{doc.get('title', 'Unknown')}' split into {len(fragments)} fragments")
                 
-                # Generate embedding for fragment
-                embedding = self.model.encode(fragment, convert_to_tensor=False)
-                self.embeddings.append(embedding)
-        
-        # Update TF-IDF based on fragments
-        if self.fragments:
-            fragment_texts = [frag['fragment_text'] for frag in self.fragments]
-            self.tfidf_matrix = self.tfidf_vectorizer.fit_transform(fragment_texts)
-        
-        added_fragments = len(self.fragments) - (original_count * self.chunk_size // self.chunk_size)
-        logger.info(f"Added {len(self.documents)} documents, {len(self.fragments)} fragments")
-        return len(self.documents)
+                # Create fragments with metadata
+                for i, fragment in enumerate(fragments):
+                    fragment_doc = {
+                        'original_doc_index': len(stored_documents) - 1,
+                        'fragment_index': i,
+                        'fragment_text': fragment,
+                        'title': doc.get('title', ''),
+                        'authors': doc.get('authors', []),
+                        'arxiv_id': doc.get('arxiv_id', ''),
+                        'published_date': doc.get('published_date', ''),
+                        'categories': doc.get('categories', []),
+                        'fragment_length': len(fragment),
+                        'total_fragments': len(fragments)
+                    }
+                    
+                    stored_fragments.append(fragment_doc)
+                    new_texts.append(fragment)
+            
+            # Generate normalized embeddings for the fragments of all new documents in one call
+            new_embeddings = []
+            if new_texts:
+                new_embeddings = self.model.encode(new_texts, batch_size=ENCODE_BATCH_SIZE, convert_to_numpy=True,
+                                                   normalize_embeddings=True, show_progress_bar=False)
+            
+            # Index only the new fragments
+            emb_matrix = self._index_embeddings(current, new_embeddings)
+            
+            # Update TF-IDF: count terms of the new fragments only, then refit IDF on the sparse counts
+            term_counts, tfidf_transformer, tfidf_matrix = current.term_counts, current.tfidf_transformer, current.tfidf_matrix
+            if new_texts:
+                new_counts = self._term_vectorizer.transform(new_texts)
+                term_counts = new_counts if term_counts is None else sparse.vstack([term_counts, new_counts], format='csr')
+                tfidf_transformer, tfidf_matrix = self._fit_tfidf(term_counts)
+            
+            # Extend the per-fragment score features with the new fragments only
+            new_lengths, new_first = _fragment_features(stored_fragments[len(current.fragments):])
+            features = (np.concatenate([current.frag_lengths, new_lengths]),
+                        np.concatenate([current.first_fragment, new_first]))
+            
+            # Publish the new state in a single assignment, then mark its documents as stored
+            self._index = _FragmentIndex(stored_documents, stored_fragments, emb_matrix,
+                                         term_counts, tfidf_transformer, tfidf_matrix, features)
+            self._seen_keys.update(new_keys)
+            logger.info(f"Added {len(stored_documents)} documents, {len(stored_fragments)} fragments")
+            
+            if self.persist_path:
+                self.save(self.persist_path)
+            return len(stored_documents)
     
     def search(self, query, top_k=5, use_hybrid=True, min_score=0.1):
         """Search document fragments with enhanced ranking"""
         logger.info(f"Search: '{query}'")
         
-        if not self.fragments:
+        # Consistent snapshot, unaffected by concurrent writers
+        index = self._index
+        
+        if not index.fragments:
             logger.warning("No fragments to search")
             return []
         
-        # Generate query embedding
-        query_embedding = self.model.encode(query, convert_to_tensor=False)
+        # Normalized query embedding (memoized for repeated queries)
+        query_embedding = self.embed_query(query)
         
         results = []
         
-        if use_hybrid and self.tfidf_matrix is not None:
+        if use_hybrid and index.tfidf_matrix is not None:
             # Hybrid search (embeddings + TF-IDF)
-            results = self._hybrid_search(query, query_embedding, top_k, min_score)
+            results = self._hybrid_search(index, query, query_embedding, top_k, min_score)
         else:
             # Only embeddings
-            results = self._vector_search(query_embedding, top_k, min_score)
+            results = self._vector_search(index, query_embedding, top_k, min_score)
         
         logger.info(f"Found {len(results)} results")
         return results
     
+    def embed_query(self, query):
+        """Returns the L2-normalized embedding of a query (cached, read-only)"""
+        return self._encode_query(query)
+    
+    def _document_keys(self, doc):
+        """Returns the keys identifying a document: its arXiv ID and a hash of its text"""
+        keys = set()
+        if isinstance(doc, dict) and doc.get('arxiv_id'):
+            keys.add(f"id:{doc['arxiv_id']}")
+        text = self._extract_text(doc)
+        if text:
+            keys.add("text:" + hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest())
+        return keys
+    
     def _extract_text(self, doc):
         """Extracts text from document"""
         if isinstance(doc, dict):
@@ -166,171 +302,190 @@ class SimpleHuggingFaceStore:
         else:
             return str(doc)
     
-    def _vector_search(self, query_embedding, top_k, min_score):
-        """Enhanced search by fragment embeddings"""
-        similarities = []
-        
-        for i, embedding in enumerate(self.embeddings):
-            # Normalize embeddings for better comparison
-            query_norm = query_embedding / np.linalg.norm(query_embedding)
-            doc_norm = embedding / np.linalg.norm(embedding)
-            
-            # Cosine similarity
-            similarity = np.dot(query_norm, doc_norm)
-            
-            # Enhance score with additional metrics
-            enhanced_score = self._enhance_similarity_score(similarity, query_embedding, embedding, i)
-            
-            similarities.append((i, enhanced_score))
+    @staticmethod
+    def _fit_tfidf(term_counts):
+        """Fits IDF weights on term counts, returns the transformer and the L2-normalized TF-IDF matrix"""
+        tfidf_transformer = TfidfTransformer()
+        return tfidf_transformer, tfidf_transformer.fit_transform(term_counts)
+    
+    @staticmethod
+    def _normalize_rows(embeddings):
+        """Returns embeddings as a contiguous float32 matrix of unit-length rows"""
+        vectors = np.array(embeddings, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+    
+    def _store_matrix(self, vectors):
+        """Normalized embeddings in their stored form: float32, or int8 codes when quantize_embeddings is set"""
+        if self.quantize_embeddings:
+            if vectors.dtype == np.int8:
+                return vectors
+            return np.round(np.asarray(vectors, dtype=np.float32) * INT8_SCALE).astype(np.int8)
+        if vectors.dtype == np.int8:
+            return vectors.astype(np.float32) / INT8_SCALE
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+    
+    @staticmethod
+    def _similarities(emb_matrix, query_embedding):
+        """Cosine similarities of the normalized query to the stored rows (int8 codes scored block by block)"""
+        if emb_matrix.dtype != np.int8:
+            return emb_matrix @ query_embedding
+        
+        query = np.asarray(query_embedding, dtype=np.float32) / INT8_SCALE
+        similarities = np.empty(emb_matrix.shape[0], dtype=np.float32)
+        for start in range(0, emb_matrix.shape[0], INT8_SCORE_BLOCK_ROWS):
+            block = emb_matrix[start:start + INT8_SCORE_BLOCK_ROWS]
+            similarities[start:start + block.shape[0]] = block.astype(np.float32) @ query
+        return similarities
+    
+    def _index_embeddings(self, index, embeddings):
+        """Returns the search matrix of `index` extended with new (normalized) fragment embeddings"""
+        if len(embeddings) == 0:
+            return index.emb_matrix
         
-        # Sort by enhanced score
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        vectors = self._store_matrix(np.asarray(embeddings, dtype=np.float32))
+        return vectors if index.emb_matrix is None else np.vstack([index.emb_matrix, vectors])
+    
+    @staticmethod
+    def _top_k_indices(scores, k):
+        """Indices of the k highest scores, best first (partial selection instead of a full sort)"""
+        k = min(k, scores.size)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        return candidates[np.argsort(-scores[candidates], kind='stable')]
+    
+    def _vector_search(self, index, query_embedding, top_k, min_score):
+        """Enhanced search by fragment embeddings"""
+        if index.emb_matrix is None:
+            return []
         
-        results = []
-        for i, (frag_idx, score) in enumerate(similarities[:top_k * 2]):  # Take more candidates
-            if score >= min_score:  # Filter by minimum score
-                fragment = self.fragments[frag_idx].copy()
-                fragment['score'] = float(score)
-                fragment['rank'] = i + 1
-                
-                # Add original document information
-                if fragment['original_doc_index'] < len(self.documents):
-                    original_doc = self.documents[fragment['original_doc_index']]
-                    fragment['original_title'] = original_doc.get('title', '')
-                    fragment['original_authors'] = original_doc.get('authors', [])
-                    fragment['original_arxiv_id'] = original_doc.get('arxiv_id', '')
-                
-                results.append(fragment)
+        # Enhance every fragment before ranking: the enhancement is not monotonic in the similarity
+        similarities = self._similarities(index.emb_matrix, query_embedding)
+        scores = self._enhance_scores(index, slice(None), similarities, similarities)
         
-        return results[:top_k]  # Return only top_k
+        ranked = self._top_k_indices(scores, top_k * 2)  # Take more candidates
+        return self._build_results(index, ranked, scores[ranked], top_k, min_score)
     
-    def _hybrid_search(self, query, query_embedding, top_k, min_score):
+    def _hybrid_search(self, index, query, query_embedding, top_k, min_score):
         """Enhanced hybrid search by fragments"""
-        # TF-IDF search with enhanced parameters
-        query_tfidf = self.tfidf_vectorizer.transform([query])
-        tfidf_scores = cosine_similarity(query_tfidf, self.tfidf_matrix).flatten()
-        
-        # Embedding search
-        vector_scores = []
-        for embedding in self.embeddings:
-            # Normalize embeddings
-            query_norm = query_embedding / np.linalg.norm(query_embedding)
-            doc_norm = embedding / np.linalg.norm(embedding)
-            similarity = np.dot(query_norm, doc_norm)
-            vector_scores.append(similarity)
-        
-        # Combine results with enhanced weights
-        combined_scores = []
-        for i in range(len(self.fragments)):
-            # Normalize scores
-            tfidf_score = tfidf_scores[i] if i < len(tfidf_scores) else 0
-            vector_score = vector_scores[i] if i < len(vector_scores) else 0
-            
-            # Enhanced combination with dynamic weights
-            if tfidf_score > 0.5:  # If TF-IDF found good matches
-                combined_score = 0.4 * tfidf_score + 0.6 * vector_score
-            else:
-                combined_score = 0.2 * tfidf_score + 0.8 * vector_score
-            
-            # Additional score enhancement
-            enhanced_score = self._enhance_similarity_score(combined_score, query_embedding, self.embeddings[i], i)
-            
-            combined_scores.append((i, enhanced_score))
+        # TF-IDF search: rows and query are L2-normalized by the transformer, so a sparse product is the cosine
+        query_tfidf = index.tfidf_transformer.transform(self._term_vectorizer.transform([query]))
+        tfidf_scores = (index.tfidf_matrix @ query_tfidf.T).toarray().ravel()
+        
+        # Embedding search: cosine similarity with every fragment in one matrix-vector product
+        vector_scores = self._similarities(index.emb_matrix, query_embedding)
+        
+        # Combine results with enhanced weights (more TF-IDF weight where it found good matches)
+        combined_scores = np.where(tfidf_scores > 0.5,
+                                   0.4 * tfidf_scores + 0.6 * vector_scores,
+                                   0.2 * tfidf_scores + 0.8 * vector_scores)
         
-        # Sort by enhanced score
-        combined_scores.sort(key=lambda x: x[1], reverse=True)
+        # Additional score enhancement
+        scores = self._enhance_scores(index, slice(None), combined_scores, vector_scores)
         
+        ranked = self._top_k_indices(scores, top_k * 2)
+        return self._build_results(index, ranked, scores[ranked], top_k, min_score)
+    
+    def _build_results(self, index, frag_indices, scores, top_k, min_score):
+        """Builds result dicts for ranked fragments, keeping those above min_score"""
         results = []
-        for i, (frag_idx, score) in enumerate(combined_scores[:top_k * 2]):
-            if score >= min_score:
-                fragment = self.fragments[frag_idx].copy()
+        for i, (frag_idx, score) in enumerate(zip(frag_indices, scores)):
+            if score >= min_score:  # Filter by minimum score
+                fragment = index.fragments[frag_idx].copy()
                 fragment['score'] = float(score)
                 fragment['rank'] = i + 1
                 
                 # Add original document information
-                if fragment['original_doc_index'] < len(self.documents):
-                    original_doc = self.documents[fragment['original_doc_index']]
+                if fragment['original_doc_index'] < len(index.documents):
+                    original_doc = index.documents[fragment['original_doc_index']]
                     fragment['original_title'] = original_doc.get('title', '')
                     fragment['original_authors'] = original_doc.get('authors', [])
                     fragment['original_arxiv_id'] = original_doc.get('arxiv_id', '')
                 
                 results.append(fragment)
         
-        return results[:top_k]
+        return results[:top_k]  # Return only top_k
     
-    def _enhance_similarity_score(self, base_score, query_embedding, doc_embedding, frag_index=None):
-        """Enhances base score with additional metrics"""
-        enhanced_score = base_score
-        
+    def _enhance_scores(self, index, rows, base_scores, similarities):
+        """Enhances base scores of fragments `rows` with additional metrics
+        
+        Args:
+            index: Storage snapshot
+            rows: Fragment indices (array or slice) the scores belong to
+            base_scores: Scores to enhance
+            similarities: Cosine similarities of the fragments to the normalized query
+        """
         # 1. Normalize to range [0, 1]
-        enhanced_score = max(0, min(1, enhanced_score))
+        scores = np.clip(base_scores, 0, 1)
         
-        # 2. Non-linear transformation to enhance differences
-        if enhanced_score > 0.5:
-            # Enhance high scores
-            enhanced_score = 0.5 + (enhanced_score - 0.5) * 1.5
-        else:
-            # Reduce low scores
-            enhanced_score = enhanced_score * 0.8
+        # 2. Non-linear transformation to enhance differences (enhance high scores, reduce low scores)
+        scores = np.where(scores > 0.5, 0.5 + (scores - 0.5) * 1.5, scores * 0.8)
         
-        # 3. Additional enhancement based on fragment length
-        if frag_index is not None and frag_index < len(self.fragments):
-            fragment = self.fragments[frag_index]
-            text_length = fragment.get('fragment_length', 0)
-            
-            # Prefer medium-length fragments
-            if 100 < text_length < 1000:
-                enhanced_score *= 1.1
-            elif text_length > 2000:
-                enhanced_score *= 0.9
-            
-            # Bonus for first fragments (usually contain introduction)
-            if fragment.get('fragment_index', 0) == 0:
-                enhanced_score *= 1.05
+        # 3. Prefer medium-length fragments, bonus for first fragments (usually contain introduction)
+        lengths = index.frag_lengths[rows]
+        scores = scores * np.where((lengths > 100) & (lengths < 1000), 1.1, np.where(lengths > 2000, 0.9, 1.0))
+        scores = scores * np.where(index.first_fragment[rows], 1.05, 1.0)
         
-        # 4. Consider semantic proximity through Euclidean distance
-        euclidean_dist = np.linalg.norm(query_embedding - doc_embedding)
+        # 4. Consider semantic proximity through Euclidean distance (|q - d|^2 = 2 - 2cos for unit vectors)
+        euclidean_dist = np.sqrt(np.maximum(2 - 2 * similarities, 0))
         euclidean_similarity = 1 / (1 + euclidean_dist / 100)  # Normalize
-        enhanced_score = 0.7 * enhanced_score + 0.3 * euclidean_similarity
+        scores = 0.7 * scores + 0.3 * euclidean_similarity
         
-        return min(1.0, enhanced_score)  # Limit maximum to 1.0
+        return np.minimum(scores, 1.0)  # Limit maximum to 1.0
     
     def get_statistics(self):
         """Gets storage statistics"""
+        index = self._index
         return {
-            'total_documents': len(self.documents),
-            'total_fragments': len(self.fragments),
+            'total_documents': len(index.documents),
+            'total_fragments': len(index.fragments),
             'embedding_model': self.model_name,
-            'embedding_dimension': len(self.embeddings[0]) if self.embeddings else 0,
-            'tfidf_features': self.tfidf_vectorizer.get_feature_names_out().shape[0] if self.tfidf_matrix is not None else 0,
+            'embedding_dimension': index.emb_matrix.shape[1] if index.emb_matrix is not None else 0,
+            'tfidf_features': int(np.count_nonzero(index.term_counts.getnnz(axis=0))) if index.term_counts is not None else 0,
             'chunk_size': self.chunk_size,
             'chunk_overlap': self.chunk_overlap,
-            'avg_fragments_per_doc': len(self.fragments) / len(self.documents) if self.documents else 0
+            'avg_fragments_per_doc': len(index.fragments) / len(index.documents) if index.documents else 0
         }
     
     def clear(self):
         """Clears storage"""
-        self.documents = []
-        self.fragments = []
-        self.embeddings = []
-        self.tfidf_matrix = None
-        logger.info("Storage cleared")
+        with self._write_lock:
+            self._index = _FragmentIndex()
+            self._seen_keys = set()
+            logger.info("Storage cleared")
+            
+            if self.persist_path:
+                self.save(self.persist_path)
     
     def save(self, filepath):
-        """Saves storage"""
+        """Saves storage (metadata pickle plus the embedding matrix in a .emb.npy sidecar)"""
+        index = self._index
         data = {
-            'documents': self.documents,
-            'fragments': self.fragments,
-            'embeddings': self.embeddings,
+            'documents': index.documents,
+            'fragments': index.fragments,
             'model_name': self.model_name,
             'chunk_size': self.chunk_size,
             'chunk_overlap': self.chunk_overlap,
-            'tfidf_vectorizer': self.tfidf_vectorizer,
-            'tfidf_matrix': self.tfidf_matrix
+            'term_counts': index.term_counts,
+            'tfidf_transformer': index.tfidf_transformer,
+            'tfidf_matrix': index.tfidf_matrix
         }
         
-        with open(filepath, 'wb') as f:
+        os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
+        
+        # Write then rename: a loaded matrix may still be memory-mapped from the previous file
+        if index.emb_matrix is not None:
+            tmp_path = filepath + ".emb.npy.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, index.emb_matrix)
+            os.replace(tmp_path, filepath + ".emb.npy")
+        elif os.path.exists(filepath + ".emb.npy"):
+            os.remove(filepath + ".emb.npy")
+        
+        with open(filepath + ".tmp", 'wb') as f:
             pickle.dump(data, f)
+        os.replace(filepath + ".tmp", filepath)
         
         logger.info(f"Storage saved to {filepath}")
     
@@ -339,17 +494,43 @@ class SimpleHuggingFaceStore:
         with open(filepath, 'rb') as f:
             data = pickle.load(f)
         
-        self.documents = data['documents']
-        self.fragments = data.get('fragments', [])  # Backward compatibility
-        self.embeddings = data['embeddings']
-        self.model_name = data['model_name']
-        self.chunk_size = data.get('chunk_size', 512)
-        self.chunk_overlap = data.get('chunk_overlap', 50)
-        self.tfidf_vectorizer = data['tfidf_vectorizer']
-        self.tfidf_matrix = data['tfidf_matrix']
-        
-        # Reload model
-        self.model = SentenceTransformer(self.model_name, cache_folder=self.cache_dir, use_auth_token=os.getenv("HUGGINGFACE_API_KEY"))
+        with self._write_lock:
+            previous_model_name = self.model_name
+            self.model_name = data['model_name']
+            self.chunk_size = data.get('chunk_size', 512)
+            self.chunk_overlap = data.get('chunk_overlap', 50)
+            
+            documents = data['documents']
+            self._seen_keys = set()
+            for doc in documents:
+                self._seen_keys.update(self._document_keys(doc))
+            
+            # Memory-map the saved (already normalized) matrix; older files pickled a list of raw vectors
+            if os.path.exists(filepath + ".emb.npy"):
+                emb_matrix = np.load(filepath + ".emb.npy", mmap_mode="r")
+            else:
+                embeddings = data.get('embeddings')
+                emb_matrix = self._normalize_rows(embeddings) if embeddings is not None and len(embeddings) else None
+            
+            # Convert a matrix saved with the other quantize_embeddings setting
+            if emb_matrix is not None and (emb_matrix.dtype == np.int8) != self.quantize_embeddings:
+                emb_matrix = self._store_matrix(emb_matrix)
+            
+            # Term counts; files saved with a fitted TfidfVectorizer are recounted once
+            fragments = data.get('fragments', [])  # Backward compatibility
+            term_counts, tfidf_transformer, tfidf_matrix = data.get('term_counts'), data.get('tfidf_transformer'), data.get('tfidf_matrix')
+            if term_counts is None and fragments:
+                term_counts = self._term_vectorizer.transform([frag['fragment_text'] for frag in fragments])
+                tfidf_transformer, tfidf_matrix = self._fit_tfidf(term_counts)
+            elif term_counts is None:
+                tfidf_matrix = None
+            
+            self._index = _FragmentIndex(documents, fragments, emb_matrix,
+                                         term_counts, tfidf_transformer, tfidf_matrix)
+            
+            # Reload model if the storage was built with a different one
+            if self.model_name != previous_model_name:
+                self._load_model()
         
         logger.info(f"Storage loaded from {filepath}")
         logger.info(f"Loaded {len(self.documents)} documents, {len(self.fragments)} fragments")
@@ -0,0 +1,105 @@
+"""
+PDF to text extraction for arXiv papers
+Kept free of sessions and settings loading so worker processes can import it cheaply
+"""
+
+import hashlib
+import os
+import re
+import PyPDF2
+
+# Optional fast PDF text extraction (MuPDF), PyPDF2 is used otherwise
+try:
+    import fitz
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+# Extracted PDF text, keyed by a hash of the file contents
+ARXIV_TEXT_CACHE_DIR = os.getenv("ARXIV_TEXT_CACHE_DIR", "./arxiv_text_cache")
+
+# Text cleaning patterns (compiled once, used for every extracted paper):
+# whitespace runs, arXiv identifiers and repeated punctuation are handled in a single pass
+_RE_CLEANUP = re.compile(r'(\s+)|arXiv:\d+\.\d+|([.!?])\2+')
+_RE_TRAILING_NUMBER = re.compile(r'\b\d+\s*$')
+
+
+def _cleanup_replacement(match) -> str:
+    """Replacement for _RE_CLEANUP matches"""
+    if match.group(1):
+        return ' '  # Whitespace run
+    return match.group(2) or ''  # Repeated punctuation / arXiv identifier
+
+
+def clean_text(text: str) -> str:
+    """
+    Cleans extracted text from extra characters and formatting
+
+    Args:
+        text: Original text
+
+    Returns:
+        Cleaned text
+    """
+    # Collapse spaces and line breaks, remove arXiv identifiers and repeating characters
+    text = _RE_CLEANUP.sub(_cleanup_replacement, text)
+
+    # Remove page number at the end
+    text = _RE_TRAILING_NUMBER.sub('', text)
+
+    # Remove extra spaces at beginning and end
+    return text.strip()
+
+
+def read_pdf_text(pdf_path: str) -> str:
+    """Extracts and cleans the text of a PDF file (PyMuPDF, falling back to PyPDF2)"""
+    if PYMUPDF_AVAILABLE:
+        try:
+            with fitz.open(pdf_path) as pdf:
+                text = "\n".join(page.get_text("text") for page in pdf)
+            return clean_text(text)
+        except Exception as e:
+            print(f"PyMuPDF could not read {pdf_path}, falling back to PyPDF2: {e}")
+
+    try:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            text = "".join(page.extract_text() or "" for page in pdf_reader.pages)
+            return clean_text(text)
+    except Exception as e:
+        print(f"Error extracting text from PDF {pdf_path}: {e}")
+        return ""
+
+
+def extract_pdf_text(pdf_path: str) -> str:
+    """
+    Extracts full text from PDF file, reusing the on-disk text cache
+    Module-level so it can be mapped over a process pool
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Returns:
+        Extracted text
+    """
+    try:
+        with open(pdf_path, 'rb') as file:
+            digest = hashlib.blake2b(file.read(), digest_size=16).hexdigest()
+    except OSError as e:
+        print(f"Error extracting text from PDF {pdf_path}: {e}")
+        return ""
+
+    cache_path = os.path.join(ARXIV_TEXT_CACHE_DIR, f"{digest}.txt")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    text = read_pdf_text(pdf_path)
+    if text:
+        # Write then rename, other workers may read the same entry
+        os.makedirs(ARXIV_TEXT_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, cache_path)
+    return text
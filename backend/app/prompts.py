@@ -31,13 +31,19 @@ prompts = {
     }
 }
 
+# Plantillas indexadas por (plataforma, idioma): una sola búsqueda por petición
+_TEMPLATES = {
+    (platform, language): template
+    for platform, templates in prompts.items()
+    for language, template in templates.items()
+}
+
 def get_prompt(platform: str, topic: str, language: str = "es") -> str:
-    plataform_templates = prompts.get(platform.lower())
-    if not plataform_templates:
-        raise ValueError("Plataforma no soportada")
-    
-    template = plataform_templates.get(language)
-    if not template:
-        raise ValueError("Idioma {language} no soportado")
+    platform = platform.lower()
+    template = _TEMPLATES.get((platform, language))
+    if template is None:
+        if platform not in prompts:
+            raise ValueError("Plataforma no soportada")
+        raise ValueError(f"Idioma {language} no soportado")
     
-    return template.format(topic=topic)
\ No newline at end of file
+    return template.format(topic=topic)
@@ -6,12 +6,18 @@ Cloud-based vector database for ArXiv articles
 
 import os
 import json
+import uuid
+import numpy as np
 from typing import List, Dict, Optional
 from datetime import datetime
+from functools import lru_cache
 import logging
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dotenv import load_dotenv
+from .embedding_cache import EmbeddingCache, EMBEDDING_CACHE_PATH
+from .vector_store_config import detect_device
 
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -20,8 +26,10 @@ load_dotenv(dotenv_path=env_path)
 try:
     from qdrant_client import QdrantClient
     from qdrant_client.models import (
-        Distance, VectorParams, PointStruct, 
-        Filter, FieldCondition, MatchValue, Range
+        Distance, VectorParams,
+        Filter, FieldCondition, MatchValue, MatchAny, Range,
+        ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+        SearchParams, QuantizationSearchParams, OptimizersConfigDiff
     )
     QDRANT_AVAILABLE = True
 except ImportError:
@@ -38,6 +46,55 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Fragments embedded and uploaded together; bounds ingestion memory
+INGEST_WINDOW_FRAGMENTS = 2048
+
+# Ingests of at least this many documents pause HNSW indexing until all points are uploaded
+BULK_INGEST_MIN_DOCUMENTS = 100
+DEFAULT_INDEXING_THRESHOLD = 20000  # restored when the collection reports none
+
+# Concurrent window uploads (network-bound, overlapped with embedding)
+UPLOAD_WORKERS = 4
+
+# Fragment count from which ingestion is sharded across GPUs (also the per-worker chunk size)
+MULTI_PROCESS_MIN_FRAGMENTS = 1000
+
+# Qdrant transport: gRPC (protobuf, binary vectors) unless disabled, e.g. when only the REST port is exposed
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+
+# Encoder runtime: "torch" (default) or "onnx" (ONNX Runtime kernels, faster on CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+# Number of query embeddings kept in memory
+QUERY_CACHE_SIZE = 4096
+
+# Fragments per forward pass when embedding documents
+ENCODE_BATCH_SIZE = 64
+
+# Points per upload request (upload_collection splits the matrix into batches of this size)
+UPLOAD_BATCH_SIZE = 256
+
+# Preferred fragment break points, best first: sentence end, paragraph, line, word
+FRAGMENT_BREAK_CHARS = ('. ', '\n\n', '\n', ' ')
+
+# Matches one point per document, used to count documents without keeping them in memory
+_FIRST_FRAGMENT_FILTER = Filter(
+    must=[FieldCondition(key="fragment_index", match=MatchValue(value=0))]
+) if QDRANT_AVAILABLE else None
+
+@lru_cache(maxsize=256)
+def _build_category_filter(categories: tuple) -> "Filter":
+    """Builds the Qdrant payload filter matching any of the given arXiv categories (shared, do not mutate)"""
+    return Filter(
+        must=[
+            FieldCondition(
+                key="categories",
+                match=MatchAny(any=list(categories))
+            )
+        ]
+    )
+
 class QdrantVectorStore:
     """Cloud-based vector storage using Qdrant"""
     
@@ -47,7 +104,8 @@ class QdrantVectorStore:
                  qdrant_api_key: Optional[str] = None,
                  embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
                  chunk_size: int = 512,
-                 chunk_overlap: int = 50):
+                 chunk_overlap: int = 50,
+                 embedding_cache_path: Optional[str] = EMBEDDING_CACHE_PATH):
         """
         Initialize Qdrant vector store
         
@@ -58,11 +116,11 @@ class QdrantVectorStore:
             embedding_model: HuggingFace model name
             chunk_size: Text chunk size
             chunk_overlap: Overlap between chunks
+            embedding_cache_path: SQLite file for cached fragment embeddings (empty disables it)
         """
         self.collection_name = collection_name
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.documents = []  # For compatibility with existing code
         
         if not QDRANT_AVAILABLE:
             raise ImportError("Qdrant client not available. Install with: pip install qdrant-client")
@@ -73,30 +131,74 @@ class QdrantVectorStore:
                 # Cloud Qdrant
                 self.client = QdrantClient(
                     url=qdrant_url,
-                    api_key=qdrant_api_key
+                    api_key=qdrant_api_key,
+                    prefer_grpc=QDRANT_PREFER_GRPC,
+                    grpc_port=QDRANT_GRPC_PORT
                 )
                 logger.info(f"Connected to Qdrant cloud: {qdrant_url}")
             else:
                 # Local Qdrant
-                self.client = QdrantClient(url=qdrant_url)
+                self.client = QdrantClient(url=qdrant_url, prefer_grpc=QDRANT_PREFER_GRPC,
+                                           grpc_port=QDRANT_GRPC_PORT)
                 logger.info(f"Connected to local Qdrant: {qdrant_url}")
         else:
             # Local Qdrant with default settings
-            self.client = QdrantClient("localhost", port=6333)
+            self.client = QdrantClient("localhost", port=6333, prefer_grpc=QDRANT_PREFER_GRPC,
+                                       grpc_port=QDRANT_GRPC_PORT)
             logger.info("Connected to local Qdrant on localhost:6333")
         
         # Initialize embedding model
         if not SENTENCE_TRANSFORMERS_AVAILABLE:
             raise ImportError("SentenceTransformers not available. Install with: pip install sentence-transformers")
         
-        self.embedding_model = SentenceTransformer(embedding_model, use_auth_token=os.getenv("HUGGINGFACE_API_KEY"))
+        self.embedding_model = self._load_embedding_model(embedding_model)
+        self.embedding_model_name = embedding_model
         self.embedding_dimension = self.embedding_model.get_sentence_embedding_dimension()
+        self._encode_query = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._encode_query_uncached)
+        
+        # Fragment embeddings persisted across ingestions
+        self._embedding_cache = None
+        if embedding_cache_path:
+            try:
+                self._embedding_cache = EmbeddingCache(embedding_cache_path)
+            except Exception as e:
+                logger.warning(f"Embedding cache disabled: {e}")
         
         # Create collection if it doesn't exist
         self._create_collection()
         
         logger.info(f"Qdrant vector store initialized: {collection_name}")
     
+    @staticmethod
+    def _cuda_device_count() -> int:
+        """Number of visible CUDA devices (0 without torch or CUDA)"""
+        try:
+            import torch
+        except ImportError:
+            return 0
+        return torch.cuda.device_count() if torch.cuda.is_available() else 0
+    
+    def _load_embedding_model(self, model_name: str):
+        """Loads the encoder on the best device, through ONNX Runtime when EMBEDDING_BACKEND=onnx"""
+        device = detect_device()
+        logger.info(f"Embedding device: {device}")
+        
+        if EMBEDDING_BACKEND == "onnx":
+            try:
+                model = SentenceTransformer(model_name, device=device, backend="onnx",
+                                            use_auth_token=os.getenv("HUGGINGFACE_API_KEY"))
+                logger.info("Embedding backend: onnx")
+                return model
+            except Exception as e:
+                logger.warning(f"ONNX backend unavailable, using torch ({e}). "
+                               "Install with: pip install optimum[onnxruntime]")
+        
+        model = SentenceTransformer(model_name, device=device, use_auth_token=os.getenv("HUGGINGFACE_API_KEY"))
+        if device == "cuda":
+            # FP16 weights on GPU: twice the tensor-core throughput, negligible cosine drift
+            model.half()
+        return model
+    
     def _create_collection(self):
         """Create Qdrant collection with proper schema"""
         try:
@@ -111,6 +213,13 @@ class QdrantVectorStore:
                     vectors_config=VectorParams(
                         size=self.embedding_dimension,
                         distance=Distance.COSINE
+                    ),
+                    # int8 copies of the vectors kept in RAM for the HNSW scan (4x smaller than float32)
+                    quantization_config=ScalarQuantization(
+                        scalar=ScalarQuantizationConfig(
+                            type=ScalarType.INT8,
+                            always_ram=True
+                        )
                     )
                 )
                 
@@ -133,6 +242,12 @@ class QdrantVectorStore:
                     field_schema="keyword"
                 )
                 
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name="fragment_index",
+                    field_schema="integer"
+                )
+                
                 logger.info(f"Created Qdrant collection: {self.collection_name}")
             else:
                 logger.info(f"Using existing Qdrant collection: {self.collection_name}")
@@ -143,38 +258,207 @@ class QdrantVectorStore:
     
     def _fragment_text(self, text: str) -> List[str]:
         """Fragment text into chunks"""
-        if len(text) <= self.chunk_size:
+        text_length = len(text)
+        if text_length <= self.chunk_size:
             return [text]
         
         fragments = []
         start = 0
+        min_break_offset = self.chunk_size * 0.7
         
-        while start < len(text):
+        while start < text_length:
             end = start + self.chunk_size
             
-            if end < len(text):
-                # Try to break at sentence boundaries
-                break_chars = ['. ', '\n\n', '\n', ' ']
-                best_break = end
-                
-                for char in break_chars:
+            if end < text_length:
+                # Try to break at sentence boundaries (searches only the current window)
+                earliest_break = start + min_break_offset
+                for char in FRAGMENT_BREAK_CHARS:
                     pos = text.rfind(char, start, end)
-                    if pos > start + self.chunk_size * 0.7:
-                        best_break = pos + len(char)
+                    if pos > earliest_break:
+                        end = pos + len(char)
                         break
-                
-                end = best_break
             
             fragment = text[start:end].strip()
             if fragment:
                 fragments.append(fragment)
             
             start = end - self.chunk_overlap
-            if start >= len(text):
+            if start >= text_length:
                 break
         
         return fragments
     
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Runs the encoder, sharding large ingests across worker processes when several GPUs are present"""
+        if len(texts) >= MULTI_PROCESS_MIN_FRAGMENTS and self._cuda_device_count() > 1:
+            # One worker per GPU; on CPU torch already spreads a single encode over all cores
+            pool = self.embedding_model.start_multi_process_pool()
+            try:
+                embeddings = self.embedding_model.encode_multi_process(texts, pool, batch_size=ENCODE_BATCH_SIZE,
+                                                                       chunk_size=MULTI_PROCESS_MIN_FRAGMENTS)
+            finally:
+                self.embedding_model.stop_multi_process_pool(pool)
+        else:
+            embeddings = self.embedding_model.encode(texts, batch_size=ENCODE_BATCH_SIZE,
+                                                     convert_to_numpy=True, show_progress_bar=False)
+        return embeddings.astype(np.float32, copy=False)
+    
+    def _encode_fragments(self, texts: List[str]) -> np.ndarray:
+        """Embeds fragments, only running the model on texts missing from the embedding cache"""
+        if self._embedding_cache is None:
+            return self._encode_texts(texts)
+        
+        keys = [EmbeddingCache.make_key(text) for text in texts]
+        try:
+            vectors = self._embedding_cache.get_many(self.embedding_model_name, keys)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            vectors = {}
+        
+        # One encode per distinct missing text
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            new_vectors = dict(zip(missing, self._encode_texts(list(missing.values()))))
+            try:
+                self._embedding_cache.set_many(self.embedding_model_name, new_vectors)
+            except Exception as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+            vectors.update(new_vectors)
+        
+        logger.info(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} encoded")
+        return np.stack([vectors[key] for key in keys])
+    
+    def _prepare_window(self, window: List[tuple], added_date: str, results: Dict):
+        """Embeds a window of (document, fragments) pairs and returns its (ids, payloads, vectors), or None if empty"""
+        # Generate the window's embeddings in a single batched call
+        window_texts = [fragment for _, fragments in window for fragment in fragments]
+        window_embeddings = None
+        if window_texts:
+            try:
+                window_embeddings = self._encode_fragments(window_texts)
+            except Exception as e:
+                # Fall back to one call per document so a bad document only fails itself
+                logger.warning(f"Batch encoding failed, retrying per document: {e}")
+        
+        # Collect ids and payloads for each fragment
+        ids = []
+        payloads = []
+        vectors = []
+        offset = 0
+        for doc, fragments in window:
+            doc_offset = offset
+            offset += len(fragments)
+            try:
+                if window_embeddings is not None:
+                    embeddings = window_embeddings[doc_offset:offset]
+                else:
+                    embeddings = self._encode_fragments(fragments)
+                
+                doc_ids = []
+                doc_payloads = []
+                id_prefix = f"{doc.get('arxiv_id', 'unknown')}_"
+                # Document-level fields, looked up once and shared by every fragment
+                base_payload = {
+                    'arxiv_id': doc.get('arxiv_id', ''),
+                    'title': doc.get('title', ''),
+                    'authors': doc.get('authors', []),
+                    'published_date': doc.get('published_date', ''),
+                    'categories': doc.get('categories', []),
+                    'pdf_url': doc.get('pdf_url', ''),
+                    'browser_url': doc.get('browser_url', ''),
+                    'total_fragments': len(fragments),
+                    'source': 'arxiv',
+                    'added_date': added_date
+                }
+                for j, fragment in enumerate(fragments):
+                    # Create point with valid UUID format
+                    doc_ids.append(str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{id_prefix}{j}")))
+                    doc_payloads.append({
+                        **base_payload,
+                        'fragment_text': fragment,
+                        'fragment_index': j,
+                        'text_length': len(fragment)
+                    })
+                
+                ids.extend(doc_ids)
+                payloads.extend(doc_payloads)
+                vectors.append(embeddings)
+                
+                results['processed'] += 1
+                logger.info(f"Document processed: {len(fragments)} fragments")
+                
+            except Exception as e:
+                error_msg = f"Error processing document {doc.get('arxiv_id', 'Unknown')}: {str(e)}"
+                logger.error(error_msg)
+                results['errors'] += 1
+                results['errors_details'].append(error_msg)
+        
+        if not ids:
+            return None
+        return ids, payloads, np.vstack(vectors)
+    
+    def _upload_points(self, ids: List[str], payloads: List[Dict], vectors: np.ndarray):
+        """Uploads one window of points (vectors go over the wire straight from the float32 matrix)"""
+        self.client.upload_collection(
+            collection_name=self.collection_name,
+            vectors=vectors,
+            payload=payloads,
+            ids=ids,
+            batch_size=UPLOAD_BATCH_SIZE,
+            wait=True
+        )
+    
+    def _submit_window(self, upload_pool: ThreadPoolExecutor, uploads: deque,
+                       window: List[tuple], added_date: str, results: Dict):
+        """Embeds a window and queues its upload, so the next window is embedded while this one is in flight"""
+        batch = self._prepare_window(window, added_date, results)
+        if batch is None:
+            return
+        
+        # Bound the windows held in memory by in-flight uploads
+        if len(uploads) >= UPLOAD_WORKERS:
+            self._finish_upload(*uploads.popleft(), results)
+        uploads.append((upload_pool.submit(self._upload_points, *batch), len(batch[0])))
+    
+    def _finish_upload(self, future, count: int, results: Dict):
+        """Waits for a queued upload and records its outcome in results"""
+        try:
+            future.result()
+            results['points_added'] += count
+            logger.info(f"Successfully added {count} points to Qdrant")
+            
+        except Exception as e:
+            error_msg = f"Error uploading to Qdrant: {str(e)}"
+            logger.error(error_msg)
+            results['errors'] += 1
+            results['errors_details'].append(error_msg)
+    
+    def _pause_indexing(self) -> Optional[int]:
+        """Disables HNSW indexing on the collection, returning the previous threshold (None if unchanged)"""
+        try:
+            collection_info = self.client.get_collection(self.collection_name)
+            previous = collection_info.config.optimizer_config.indexing_threshold
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=0)
+            )
+            logger.info("HNSW indexing paused for bulk ingest")
+            return previous if previous is not None else DEFAULT_INDEXING_THRESHOLD
+        except Exception as e:
+            logger.warning(f"Could not pause HNSW indexing: {e}")
+            return None
+    
+    def _resume_indexing(self, indexing_threshold: int):
+        """Restores the HNSW indexing threshold saved by _pause_indexing"""
+        try:
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=indexing_threshold)
+            )
+            logger.info("HNSW indexing resumed")
+        except Exception as e:
+            logger.error(f"Error resuming HNSW indexing: {e}")
+    
     def add_documents(self, documents: List[Dict]) -> Dict:
         """
         Add documents to Qdrant
@@ -196,87 +480,64 @@ class QdrantVectorStore:
             'points_added': 0
         }
         
-        all_points = []
-        
-        for i, doc in enumerate(documents):
-            try:
-                logger.info(f"Processing document {i+1}/{len(documents)}: {doc.get('title', 'Unknown')}")
-                
-                # Store document for compatibility
-                self.documents.append(doc)
-                
-                # Extract text content
-                full_text = doc.get('full_text', '')
-                if not full_text:
-                    full_text = doc.get('abstract', '')
-                
-                # Fragment text
-                fragments = self._fragment_text(full_text)
-                results['fragments_created'] += len(fragments)
-                
-                # Create points for each fragment
-                for j, fragment in enumerate(fragments):
-                    # Generate embedding
-                    embedding = self.embedding_model.encode(fragment).tolist()
-                    
-                    # Create point with valid UUID format
-                    import uuid
-                    point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{doc.get('arxiv_id', 'unknown')}_{j}"))
-                    
-                    point = PointStruct(
-                        id=point_id,
-                        vector=embedding,
-                        payload={
-                            'arxiv_id': doc.get('arxiv_id', ''),
-                            'title': doc.get('title', ''),
-                            'authors': doc.get('authors', []),
-                            'published_date': doc.get('published_date', ''),
-                            'categories': doc.get('categories', []),
-                            'pdf_url': doc.get('pdf_url', ''),
-                            'browser_url': doc.get('browser_url', ''),
-                            'fragment_text': fragment,
-                            'fragment_index': j,
-                            'total_fragments': len(fragments),
-                            'text_length': len(fragment),
-                            'source': 'arxiv',
-                            'added_date': datetime.now().isoformat()
-                        }
-                    )
+        # Documents are fragmented, embedded and uploaded in windows of about
+        # INGEST_WINDOW_FRAGMENTS fragments, so memory stays bounded for large ingests;
+        # uploads run on a thread pool while the next window is embedded
+        added_date = datetime.now().isoformat()
+        window = []
+        window_fragments = 0
+        uploads = deque()
+        # HNSW building is paused for bulk loads and done once at the end
+        indexing_threshold = self._pause_indexing() if len(documents) >= BULK_INGEST_MIN_DOCUMENTS else None
+        try:
+            with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as upload_pool:
+                for i, doc in enumerate(documents):
+                    try:
+                        logger.info(f"Processing document {i+1}/{len(documents)}: {doc.get('title', 'Unknown')}")
+                        
+                        # Extract text content
+                        full_text = doc.get('full_text', '')
+                        if not full_text:
+                            full_text = doc.get('abstract', '')
+                        
+                        # Fragment text
+                        fragments = self._fragment_text(full_text)
+                        results['fragments_created'] += len(fragments)
+                        window.append((doc, fragments))
+                        window_fragments += len(fragments)
+                        
+                    except Exception as e:
+                        error_msg = f"Error processing document {doc.get('arxiv_id', 'Unknown')}: {str(e)}"
+                        logger.error(error_msg)
+                        results['errors'] += 1
+                        results['errors_details'].append(error_msg)
                     
-                    all_points.append(point)
+                    if window_fragments >= INGEST_WINDOW_FRAGMENTS:
+                        self._submit_window(upload_pool, uploads, window, added_date, results)
+                        window = []
+                        window_fragments = 0
                 
-                results['processed'] += 1
-                logger.info(f"Document processed: {len(fragments)} fragments")
-                
-            except Exception as e:
-                error_msg = f"Error processing document {doc.get('arxiv_id', 'Unknown')}: {str(e)}"
-                logger.error(error_msg)
-                results['errors'] += 1
-                results['errors_details'].append(error_msg)
-        
-        # Batch upload to Qdrant
-        if all_points:
-            try:
-                batch_size = 100  # Qdrant recommended batch size
-                for i in range(0, len(all_points), batch_size):
-                    batch = all_points[i:i + batch_size]
-                    self.client.upsert(
-                        collection_name=self.collection_name,
-                        points=batch
-                    )
-                    results['points_added'] += len(batch)
-                
-                logger.info(f"Successfully added {results['points_added']} points to Qdrant")
-                
-            except Exception as e:
-                error_msg = f"Error uploading to Qdrant: {str(e)}"
-                logger.error(error_msg)
-                results['errors'] += 1
-                results['errors_details'].append(error_msg)
+                if window:
+                    self._submit_window(upload_pool, uploads, window, added_date, results)
+                while uploads:
+                    self._finish_upload(*uploads.popleft(), results)
+        finally:
+            if indexing_threshold is not None:
+                self._resume_indexing(indexing_threshold)
         
         logger.info(f"Qdrant processing completed: {results['processed']} documents, {results['points_added']} points")
         return results
     
+    def _encode_query_uncached(self, query: str) -> np.ndarray:
+        """Encodes a query (read-only result, shared between cache hits)"""
+        embedding = self.embedding_model.encode(query, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32, copy=False)
+        embedding.setflags(write=False)
+        return embedding
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Returns the L2-normalized embedding of a query (memoized for repeated queries)"""
+        return self._encode_query(query)
+    
     def search(self, 
                query: str, 
                top_k: int = 5,
@@ -297,27 +558,24 @@ class QdrantVectorStore:
         logger.info(f"Searching Qdrant for: '{query}'")
         
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode(query).tolist()
+            # Generate query embedding (cosine distance, so the normalized cached vector is equivalent)
+            query_embedding = self.embed_query(query)
             
-            # Build filter
+            # Build filter (memoized per category set)
             search_filter = None
             if filter_categories:
-                search_filter = Filter(
-                    must=[
-                        FieldCondition(
-                            key="categories",
-                            match=MatchValue(value=category)
-                        ) for category in filter_categories
-                    ]
-                )
+                search_filter = _build_category_filter(tuple(filter_categories))
             
             # Search in Qdrant
             search_result = self.client.search(
                 collection_name=self.collection_name,
                 query_vector=query_embedding,
                 query_filter=search_filter,
-                limit=top_k * 2,  # Get more results for filtering
+                # Rescore the int8 candidates against the original float32 vectors
+                search_params=SearchParams(
+                    quantization=QuantizationSearchParams(rescore=True, oversampling=2.0)
+                ),
+                limit=top_k,
                 score_threshold=min_score
             )
             
@@ -344,10 +602,6 @@ class QdrantVectorStore:
                 
                 results.append(result)
             
-            # Sort by score and limit results
-            results = sorted(results, key=lambda x: x['score'], reverse=True)
-            results = results[:top_k]
-            
             logger.info(f"Qdrant search found {len(results)} results")
             return results
             
@@ -355,6 +609,14 @@ class QdrantVectorStore:
             logger.error(f"Qdrant search error: {e}")
             return []
     
+    def count_documents(self) -> int:
+        """Number of documents in the collection (each document has exactly one fragment 0)"""
+        return self.client.count(
+            collection_name=self.collection_name,
+            count_filter=_FIRST_FRAGMENT_FILTER,
+            exact=True
+        ).count
+    
     def get_statistics(self) -> Dict:
         """Get Qdrant collection statistics"""
         try:
@@ -363,7 +625,7 @@ class QdrantVectorStore:
             return {
                 'collection_name': self.collection_name,
                 'total_points': collection_info.points_count,
-                'total_documents': len(self.documents),  # For compatibility
+                'total_documents': self.count_documents(),
                 'vector_size': collection_info.config.params.vectors.size,
                 'distance_metric': str(collection_info.config.params.vectors.distance),
                 'embedding_model': self.embedding_model.get_sentence_embedding_dimension(),
@@ -1,14 +1,77 @@
-from groq import Groq
+import asyncio
+import time
+import orjson
+from groq import Groq, AsyncGroq
 from typing import List, Dict, Optional
+from functools import lru_cache
 import logging
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from .llm_cache import llm_cache
+from .config import GROQ_MAX_CONCURRENCY
 
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+# INFO unless RAG_LOG_LEVEL=DEBUG: the root logger is at DEBUG (config.py), and the document dump is large
 logger = logging.getLogger(__name__)
+_rag_log_level = os.getenv("RAG_LOG_LEVEL", "INFO").upper()
+if isinstance(logging.getLevelName(_rag_log_level), int):
+    logger.setLevel(_rag_log_level)
+else:
+    logger.setLevel(logging.INFO)
+    logger.warning(f"Unknown RAG_LOG_LEVEL '{_rag_log_level}', using INFO")
+
+# Static RAG instructions, identical for every request
+RAG_SYSTEM_PROMPT = """You are a helpful AI assistant that answers questions based on scientific articles from arXiv. 
+Use the provided document fragments to answer the user's question accurately and comprehensively.
+
+IMPORTANT: These are text fragments from scientific papers. Even if a fragment seems incomplete, 
+if it contains relevant information that answers the user's question, use it to provide a complete answer.
+
+If the documents don't contain enough information to answer the question, say so clearly.
+Always cite the source articles when providing information."""
+
+# Number of formatted document blocks kept in memory
+PROMPT_CACHE_SIZE = 512
+
+@lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def _build_documents_block(fragments: tuple) -> str:
+    """Formats the retrieved fragments block (memoized, retries and repeated queries reuse it)"""
+    parts = ["Document fragments:\n"]
+    
+    # Add retrieved documents
+    for i, (title, authors, arxiv_id, text_content) in enumerate(fragments, 1):
+        parts.append(
+            f"\n--- Document {i} ---\n"
+            f"Title: {title}\n"
+            f"Authors: {', '.join(authors)}\n"
+            f"arXiv ID: {arxiv_id}\n"
+            f"Text: {text_content}\n"
+        )
+    
+    return "".join(parts)
+
+@lru_cache(maxsize=PROMPT_CACHE_SIZE)
+def _lower_text(text: str) -> str:
+    """Lower-cased fragment text (memoized, fragments are re-analyzed across queries)"""
+    return text.lower()
+
+def _format_documents(query: str, retrieved_documents: List[Dict]) -> str:
+    """Human-readable summary of the retrieved documents for debug logs"""
+    parts = [f"Retrieved documents for query '{query}':\n"]
+    for i, doc in enumerate(retrieved_documents, 1):
+        # Используем fragment_text для новых фрагментов или text_snippet для старых
+        text_content = doc.get('fragment_text', doc.get('text_snippet', ''))
+        parts.append(
+            f"  {i}. Title: {doc.get('title', 'Unknown')}\n"
+            f"     Authors: {', '.join(doc.get('authors', []))}\n"
+            f"     arXiv ID: {doc.get('arxiv_id', 'Unknown')}\n"
+            f"     Score: {doc.get('score', 'N/A')}\n"
+            f"     Text: {text_content[:100]}...\n"
+        )
+    return "".join(parts)
 
 class RAGGenerator:
     """RAG (Retrieval-Augmented Generation) system using Groq LLM"""
@@ -21,47 +84,125 @@ class RAGGenerator:
             api_key: Groq API key (if not provided, will use environment variable)
         """
         self.client = Groq(api_key=api_key)
+        # Async client for concurrent requests; the semaphore keeps us under Groq's rate limits
+        self.aclient = AsyncGroq(api_key=api_key)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
         self.model = "gemma2-9b-it"
         
-    def create_rag_prompt(self, query: str, retrieved_documents: List[Dict]) -> str:
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Returns the concurrency semaphore, created inside the running event loop on first use"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(GROQ_MAX_CONCURRENCY)
+            self._semaphore_loop = loop
+        return self._semaphore
+        
+    def create_rag_messages(self, query: str, retrieved_documents: List[Dict]) -> List[Dict]:
         """
-        Creates a RAG prompt combining user query with retrieved documents
+        Creates chat messages combining user query with retrieved documents
+        
+        The static instructions come first and never change, then the retrieved
+        fragments, then the question, so repeated requests share the longest
+        possible prompt prefix (provider prompt caching).
         
         Args:
             query: User's original query
             retrieved_documents: List of retrieved document fragments
             
         Returns:
-            Formatted prompt for LLM
+            List of chat messages for LLM
         """
-        # Start with system instruction
-        prompt = """You are a helpful AI assistant that answers questions based on scientific articles from arXiv. 
-Use the provided document fragments to answer the user's question accurately and comprehensively.
-
-IMPORTANT: These are text fragments from scientific papers. Even if a fragment seems incomplete, 
-if it contains relevant information that answers the user's question, use it to provide a complete answer.
-
-If the documents don't contain enough information to answer the question, say so clearly.
-Always cite the source articles when providing information.
-
-Document fragments:
-"""
+        # Only the fields that end up in the prompt, as a hashable key for the block cache
+        fragments = tuple(
+            (
+                doc.get('title', 'Unknown'),
+                tuple(doc.get('authors', [])),
+                doc.get('arxiv_id', 'Unknown'),
+                # Используем fragment_text для новых фрагментов или text_snippet для старых
+                doc.get('fragment_text', doc.get('text_snippet', ''))
+            )
+            for doc in retrieved_documents
+        )
+        documents_block = _build_documents_block(fragments)
         
-        # Add retrieved documents
-        for i, doc in enumerate(retrieved_documents, 1):
-            prompt += f"\n--- Document {i} ---\n"
-            prompt += f"Title: {doc.get('title', 'Unknown')}\n"
-            prompt += f"Authors: {', '.join(doc.get('authors', []))}\n"
-            prompt += f"arXiv ID: {doc.get('arxiv_id', 'Unknown')}\n"
-            # Используем fragment_text для новых фрагментов или text_snippet для старых
-            text_content = doc.get('fragment_text', doc.get('text_snippet', ''))
-            prompt += f"Text: {text_content}\n"
+        return [
+            {"role": "system", "content": RAG_SYSTEM_PROMPT},
+            {"role": "system", "content": documents_block},
+            {
+                "role": "user",
+                "content": f"User Question: {query}\n\nPlease provide a comprehensive answer based on the above documents:"
+            }
+        ]
+    
+    def create_rag_prompt(self, query: str, retrieved_documents: List[Dict]) -> str:
+        """
+        Creates a RAG prompt combining user query with retrieved documents
         
-        # Add user query
-        prompt += f"\n\nUser Question: {query}\n\n"
-        prompt += "Please provide a comprehensive answer based on the above documents:"
+        Args:
+            query: User's original query
+            retrieved_documents: List of retrieved document fragments
+            
+        Returns:
+            Formatted prompt for LLM (the RAG messages as a single string)
+        """
+        messages = self.create_rag_messages(query, retrieved_documents)
+        return "\n\n".join(message["content"] for message in messages)
+    
+    def _rag_cache_key(self, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+        """Response cache key for a RAG request (shared by the sync and async paths)"""
+        return llm_cache.make_key("groq", self.model, temperature, max_tokens,
+                                  *(message["content"] for message in messages))
+    
+    def _log_request(self, query: str, retrieved_documents: List[Dict], mode: str = ""):
+        """Logs an outgoing RAG request (document details only at DEBUG level)"""
+        logger.info(f"Generating {mode}RAG response for query: '{query}'")
+        logger.info(f"Using {len(retrieved_documents)} document fragments")
         
-        return prompt
+        # Log retrieved documents for debugging (skipped unless DEBUG is enabled)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(_format_documents(query, retrieved_documents))
+    
+    def _completion_params(self, messages: List[Dict], *, stream: bool, temperature: float, max_tokens: int) -> Dict:
+        """Groq chat completion parameters, identical for every RAG call path"""
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": 1,
+            "stream": stream,
+            "stop": None
+        }
+    
+    def _invoke_groq(self, messages: List[Dict], *, stream: bool, temperature: float, max_tokens: int):
+        """Sends a chat completion request with the synchronous client"""
+        return self.client.chat.completions.create(
+            **self._completion_params(messages, stream=stream, temperature=temperature, max_tokens=max_tokens)
+        )
+    
+    @staticmethod
+    def _iter_deltas(completion):
+        """Yields the non-empty content deltas of a streamed completion"""
+        for chunk in completion:
+            content = chunk.choices[0].delta.content
+            if content:
+                yield content
+    
+    def _completion_result(self, query: str, retrieved_documents: List[Dict], completion) -> Dict:
+        """Response dictionary for a non-streamed completion"""
+        return {
+            "response": completion.choices[0].message.content,
+            "query": query,
+            "documents_used": len(retrieved_documents),
+            "model": self.model,
+            "streamed": False,
+            "usage": {
+                "prompt_tokens": completion.usage.prompt_tokens,
+                "completion_tokens": completion.usage.completion_tokens,
+                "total_tokens": completion.usage.total_tokens
+            } if hasattr(completion, 'usage') else None
+        }
     
     def generate_rag_response(self, 
                             query: str, 
@@ -83,70 +224,33 @@ Document fragments:
             Dictionary with response and metadata
         """
         try:
-            # Create RAG prompt
-            prompt = self.create_rag_prompt(query, retrieved_documents)
+            messages = self.create_rag_messages(query, retrieved_documents)
             
-            logger.info(f"Generating RAG response for query: '{query}'")
-            logger.info(f"Using {len(retrieved_documents)} document fragments")
+            # Identical non-streamed, cacheable (see llm_cache) requests are answered from cache
+            use_cache = not stream and llm_cache.cacheable(temperature)
+            cache_key = self._rag_cache_key(messages, temperature, max_tokens)
+            if use_cache:
+                cached = llm_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"RAG response served from cache for query: '{query}'")
+                    return dict(cached)
             
-            # Log retrieved documents for debugging
-            print(f"\n📚 Retrieved documents for query '{query}':")
-            for i, doc in enumerate(retrieved_documents, 1):
-                print(f"  {i}. Title: {doc.get('title', 'Unknown')}")
-                print(f"     Authors: {', '.join(doc.get('authors', []))}")
-                print(f"     arXiv ID: {doc.get('arxiv_id', 'Unknown')}")
-                print(f"     Score: {doc.get('score', 'N/A')}")
-                # Используем fragment_text для новых фрагментов или text_snippet для старых
-                text_content = doc.get('fragment_text', doc.get('text_snippet', ''))
-                print(f"     Text: {text_content[:100]}...")
-                print()
-            
-            # Generate response with Groq
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                top_p=1,
-                stream=stream,
-                stop=None,
-            )
+            self._log_request(query, retrieved_documents)
+            completion = self._invoke_groq(messages, stream=stream, temperature=temperature, max_tokens=max_tokens)
             
             if stream:
-                # Handle streaming response
-                response_text = ""
-                for chunk in completion:
-                    content = chunk.choices[0].delta.content or ""
-                    response_text += content
-                
                 return {
-                    "response": response_text,
+                    "response": "".join(self._iter_deltas(completion)),
                     "query": query,
                     "documents_used": len(retrieved_documents),
                     "model": self.model,
                     "streamed": True
                 }
-            else:
-                # Handle non-streaming response
-                response_text = completion.choices[0].message.content
-                
-                return {
-                    "response": response_text,
-                    "query": query,
-                    "documents_used": len(retrieved_documents),
-                    "model": self.model,
-                    "streamed": False,
-                    "usage": {
-                        "prompt_tokens": completion.usage.prompt_tokens,
-                        "completion_tokens": completion.usage.completion_tokens,
-                        "total_tokens": completion.usage.total_tokens
-                    } if hasattr(completion, 'usage') else None
-                }
+            
+            result = self._completion_result(query, retrieved_documents, completion)
+            if use_cache:
+                llm_cache.set(cache_key, result)
+            return dict(result)
                 
         except Exception as e:
             logger.error(f"Error generating RAG response: {e}")
@@ -157,6 +261,191 @@ Document fragments:
                 "model": self.model
             }
     
+    async def agenerate_rag_response(self, 
+                                     query: str, 
+                                     retrieved_documents: List[Dict],
+                                     temperature: float = 0.7,
+                                     max_tokens: int = 1024) -> Dict:
+        """
+        Generates a (non-streamed) RAG response without blocking the event loop
+        
+        Args:
+            query: User's query
+            retrieved_documents: Retrieved document fragments
+            temperature: Generation temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Dictionary with response and metadata (same format as generate_rag_response)
+        """
+        try:
+            messages = self.create_rag_messages(query, retrieved_documents)
+            
+            # Shares the response cache with generate_rag_response
+            use_cache = llm_cache.cacheable(temperature)
+            cache_key = self._rag_cache_key(messages, temperature, max_tokens)
+            cached = llm_cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                logger.info(f"RAG response served from cache for query: '{query}'")
+                return dict(cached)
+            
+            self._log_request(query, retrieved_documents, mode="async ")
+            async with self._get_semaphore():
+                completion = await self.aclient.chat.completions.create(
+                    **self._completion_params(messages, stream=False, temperature=temperature, max_tokens=max_tokens)
+                )
+            
+            result = self._completion_result(query, retrieved_documents, completion)
+            if use_cache:
+                llm_cache.set(cache_key, result)
+            return dict(result)
+            
+        except Exception as e:
+            logger.error(f"Error generating async RAG response: {e}")
+            return {
+                "error": str(e),
+                "query": query,
+                "documents_used": len(retrieved_documents),
+                "model": self.model
+            }
+    
+    async def batch_generate(self, 
+                             queries: List[str], 
+                             documents_list: List[List[Dict]],
+                             temperature: float = 0.7,
+                             max_tokens: int = 1024) -> List[Dict]:
+        """
+        Generates RAG responses for several queries concurrently
+        
+        Args:
+            queries: User queries
+            documents_list: Retrieved document fragments for each query
+            temperature: Generation temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            One response dictionary per query, in input order
+        """
+        return await asyncio.gather(*(
+            self.agenerate_rag_response(query, documents, temperature, max_tokens)
+            for query, documents in zip(queries, documents_list)
+        ))
+    
+    def submit_batch(self, 
+                     queries_with_documents: List[tuple],
+                     temperature: float = 0.7,
+                     max_tokens: int = 1024) -> str:
+        """
+        Submits RAG requests to Groq's batch API (offline workloads, discounted and not rate limited per call)
+        
+        Args:
+            queries_with_documents: (query, retrieved_documents) pairs; request i gets custom_id "rag-i"
+            temperature: Generation temperature
+            max_tokens: Maximum tokens to generate
+            
+        Returns:
+            Groq batch id
+        """
+        lines = [
+            orjson.dumps({
+                "custom_id": f"rag-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._completion_params(self.create_rag_messages(query, retrieved_documents),
+                                                stream=False, temperature=temperature, max_tokens=max_tokens)
+            })
+            for i, (query, retrieved_documents) in enumerate(queries_with_documents)
+        ]
+        
+        batch_file = self.client.files.create(file=("rag_batch.jsonl", b"\n".join(lines)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logger.info(f"Submitted Groq batch {batch.id} with {len(lines)} requests")
+        return batch.id
+    
+    def get_batch_results(self, batch_id: str) -> Optional[Dict[str, str]]:
+        """
+        Fetches the answers of a submitted batch
+        
+        Args:
+            batch_id: Id returned by submit_batch
+            
+        Returns:
+            {custom_id: response text} once the batch has completed, None while it is still running
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            return None
+        
+        results = {}
+        if batch.output_file_id:
+            content = self.client.files.content(batch.output_file_id).read()
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                item = orjson.loads(line)
+                response = item.get("response") or {}
+                if response.get("status_code") == 200:
+                    results[item["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+        return results
+    
+    def generate_rag_responses_batch(self, 
+                                     queries_with_documents: List[tuple],
+                                     temperature: float = 0.7,
+                                     max_tokens: int = 1024,
+                                     timeout: float = 600,
+                                     poll_interval: float = 10) -> List[Dict]:
+        """
+        Answers many RAG queries through the batch API, falling back to synchronous calls
+        
+        Requests the batch did not answer before the timeout (or that failed in it)
+        are generated one by one with generate_rag_response.
+        
+        Args:
+            queries_with_documents: (query, retrieved_documents) pairs
+            temperature: Generation temperature
+            max_tokens: Maximum tokens to generate
+            timeout: Seconds to wait for the batch before falling back
+            poll_interval: Seconds between batch status checks
+            
+        Returns:
+            One response dictionary per query, in input order
+        """
+        answers = {}
+        try:
+            batch_id = self.submit_batch(queries_with_documents, temperature, max_tokens)
+            deadline = time.monotonic() + timeout
+            while True:
+                batch_answers = self.get_batch_results(batch_id)
+                if batch_answers is not None:
+                    answers = batch_answers
+                    break
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Groq batch {batch_id} not finished after {timeout}s, falling back to sync calls")
+                    break
+                time.sleep(poll_interval)
+        except Exception as e:
+            logger.error(f"Groq batch API error, falling back to sync calls: {e}")
+        
+        results = []
+        for i, (query, retrieved_documents) in enumerate(queries_with_documents):
+            answer = answers.get(f"rag-{i}")
+            if answer is None:
+                results.append(self.generate_rag_response(query, retrieved_documents, temperature, max_tokens))
+            else:
+                results.append({
+                    "response": answer,
+                    "query": query,
+                    "documents_used": len(retrieved_documents),
+                    "model": self.model,
+                    "streamed": False,
+                    "batched": True
+                })
+        return results
+    
     def generate_rag_response_stream(self, 
                                    query: str, 
                                    retrieved_documents: List[Dict],
@@ -175,43 +464,13 @@ Document fragments:
             Content chunks as they are generated
         """
         try:
-            # Create RAG prompt
-            prompt = self.create_rag_prompt(query, retrieved_documents)
-            
-            logger.info(f"Generating streaming RAG response for query: '{query}'")
-            logger.info(f"Using {len(retrieved_documents)} document fragments")
+            messages = self.create_rag_messages(query, retrieved_documents)
             
-            # Log retrieved documents for debugging
-            print(f"\n📚 Retrieved documents for streaming query '{query}':")
-            for i, doc in enumerate(retrieved_documents, 1):
-                print(f"  {i}. Title: {doc.get('title', 'Unknown')}")
-                print(f"     Authors: {', '.join(doc.get('authors', []))}")
-                print(f"     arXiv ID: {doc.get('arxiv_id', 'Unknown')}")
-                print(f"     Score: {doc.get('score', 'N/A')}")
-                print(f"     Text snippet: {doc.get('text_snippet', '')[:100]}...")
-                print()
-            
-            # Generate response with Groq
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                top_p=1,
-                stream=True,
-                stop=None,
-            )
+            self._log_request(query, retrieved_documents, mode="streaming ")
+            completion = self._invoke_groq(messages, stream=True, temperature=temperature, max_tokens=max_tokens)
             
             # Stream response
-            for chunk in completion:
-                content = chunk.choices[0].delta.content or ""
-                if content:
-                    yield content
+            yield from self._iter_deltas(completion)
                     
         except Exception as e:
             logger.error(f"Error generating streaming RAG response: {e}")
@@ -246,6 +505,9 @@ Document fragments:
         scores = []
         topics = set()
         
+        # Query words are the same for every document
+        query_words = query.lower().split()
+        
         for i, doc in enumerate(retrieved_documents):
             # Используем fragment_text для новых фрагментов или text_snippet для старых
             text_content = doc.get('fragment_text', doc.get('text_snippet', ''))
@@ -262,9 +524,7 @@ Document fragments:
             }
             
             # Analyze relevance
-            text_lower = text_content.lower()
-            query_lower = query.lower()
-            query_words = query_lower.split()
+            text_lower = _lower_text(text_content)
             
             # Check if query words appear in document
             matching_words = [word for word in query_words if word in text_lower]
@@ -307,6 +567,13 @@ Document fragments:
             Dictionary with response
         """
         try:
+            use_cache = llm_cache.cacheable(temperature)
+            cache_key = llm_cache.make_key("groq", self.model, temperature, max_tokens, query)
+            cached = llm_cache.get(cache_key) if use_cache else None
+            if cached is not None:
+                logger.info(f"Simple response served from cache for query: '{query}'")
+                return dict(cached)
+            
             completion = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
@@ -324,7 +591,7 @@ Document fragments:
             
             response_text = completion.choices[0].message.content
             
-            return {
+            result = {
                 "response": response_text,
                 "query": query,
                 "model": self.model,
@@ -335,6 +602,9 @@ Document fragments:
                     "total_tokens": completion.usage.total_tokens
                 } if hasattr(completion, 'usage') else None
             }
+            if use_cache:
+                llm_cache.set(cache_key, result)
+            return dict(result)
             
         except Exception as e:
             logger.error(f"Error generating simple response: {e}")
@@ -0,0 +1,36 @@
+"""
+Cross-encoder reranking for retrieved fragments
+Scores each (query, fragment) pair jointly and keeps the best top_k
+"""
+
+import os
+import numpy as np
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "BAAI/bge-reranker-base")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = 32
+
+
+class Reranker:
+    """Reorders vector-search candidates with a cross-encoder"""
+
+    def __init__(self, model_name: str = RERANK_MODEL, candidates: int = RERANK_CANDIDATES):
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name)
+        self.candidates = candidates
+
+    def candidate_count(self, top_k: int) -> int:
+        """Number of fragments to retrieve before reranking down to top_k"""
+        return max(self.candidates, top_k)
+
+    def rerank(self, query: str, documents: list, top_k: int) -> list:
+        """Returns the top_k documents by cross-encoder score, each with a 'rerank_score'"""
+        if not documents:
+            return documents
+
+        texts = [doc.get('fragment_text', doc.get('text_snippet', '')) for doc in documents]
+        scores = np.asarray(self.model.predict([(query, text) for text in texts],
+                                               batch_size=RERANK_BATCH_SIZE, show_progress_bar=False))
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [{**documents[i], 'rerank_score': float(scores[i])} for i in order]
@@ -0,0 +1,99 @@
+"""
+Semantic cache for LLM responses
+Returns a cached response when a new query embedding is close enough to a previous one
+"""
+
+import os
+import threading
+import time
+import numpy as np
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "3600"))  # seconds
+
+
+class SemanticCache:
+    """Response cache keyed on query embeddings (cosine similarity lookup)"""
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, maxsize: int = SEMANTIC_CACHE_SIZE,
+                 ttl: int = SEMANTIC_CACHE_TTL):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # (N, D) matrix of normalized query embeddings, the (namespace, response) and the expiry time
+        # for each row, swapped as one tuple so readers always see a consistent state
+        self._state = (None, [], np.empty(0))
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by clear()
+
+    @property
+    def generation(self) -> int:
+        """Current cache generation; pass it to add() to drop responses built before a clear()"""
+        return self._generation
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, namespace: str = ""):
+        """Returns the cached response for the most similar query, or None on a miss"""
+        # Snapshot so lookups do not block on writers
+        embeddings, entries, expires = self._state
+        if embeddings is None:
+            return None
+
+        similarities = embeddings @ self._normalize(embedding)
+        now = time.monotonic()
+        for i in np.argsort(-similarities):
+            if similarities[i] < self.threshold:
+                break
+            if expires[i] <= now:
+                continue
+            entry_namespace, response = entries[i]
+            if entry_namespace == namespace:
+                return response
+        return None
+
+    def add(self, embedding, response, namespace: str = "", generation: int = None):
+        """Stores a response for a query embedding, evicting expired and then the oldest entries
+
+        A response built before the last clear() (its generation is older) is not stored.
+        """
+        vector = self._normalize(embedding)[None, :]
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            embeddings, entries, expires = self._state
+            now = time.monotonic()
+            if embeddings is not None:
+                live = expires > now
+                if not live.all():
+                    keep = np.flatnonzero(live)
+                    embeddings = embeddings[keep] if keep.size else None
+                    entries = [entries[i] for i in keep]
+                    expires = expires[keep]
+
+            if embeddings is None:
+                embeddings = vector
+            else:
+                embeddings = np.vstack([embeddings, vector])
+            entries = entries + [(namespace, response)]
+            expires = np.append(expires, now + self.ttl)
+
+            if len(entries) > self.maxsize:
+                embeddings = embeddings[-self.maxsize:]
+                entries = entries[-self.maxsize:]
+                expires = expires[-self.maxsize:]
+
+            self._state = (embeddings, entries, expires)
+
+    def clear(self):
+        """Drops all cached responses (e.g. when the documents they were built from change)"""
+        with self._lock:
+            self._state = (None, [], np.empty(0))
+            self._generation += 1
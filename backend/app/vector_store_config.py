@@ -12,6 +12,29 @@ from dotenv import load_dotenv
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+# CPU threads for encoder inference (some container builds default to a single thread)
+SBERT_NUM_THREADS = int(os.getenv("SBERT_NUM_THREADS", os.cpu_count() or 1))
+
+def configure_torch_threads():
+    """Sets the torch CPU thread count for encoder inference (called once at startup)"""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(SBERT_NUM_THREADS)
+
+def detect_device() -> str:
+    """Returns the fastest available torch device: CUDA, then Apple MPS, then CPU"""
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
 class StorageType(Enum):
     """Available storage types"""
     LOCAL = "local"           # SimpleHuggingFaceStore (file-based)
@@ -39,6 +62,13 @@ class VectorStoreConfig:
         self.chunk_size = int(os.getenv("CHUNK_SIZE", "512"))
         self.chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "50"))
         
+        # Local index quantization (int8)
+        self.quantize_embeddings = os.getenv("QUANTIZE_EMBEDDINGS", "false").lower() == "true"
+        self.quantize_model = os.getenv("QUANTIZE_EMBEDDING_MODEL", "false").lower() == "true"
+        
+        # Local storage persistence
+        self.local_store_path = os.getenv("LOCAL_STORE_PATH", "./vector_store/local_store.pkl")
+        
         # Collection names
         self.local_collection = os.getenv("LOCAL_COLLECTION", "arxiv_articles_local")
         self.cloud_collection = os.getenv("CLOUD_COLLECTION", "arxiv_articles_cloud")
@@ -88,7 +118,10 @@ class VectorStoreConfig:
         else:  # LOCAL
             info.update({
                 "storage_method": "file_based",
-                "cache_dir": "./huggingface_cache"
+                "cache_dir": "./huggingface_cache",
+                "store_path": self.local_store_path,
+                "quantize_embeddings": self.quantize_embeddings,
+                "quantize_model": self.quantize_model
             })
         
         return info
@@ -137,7 +170,10 @@ def create_vector_store():
         return SimpleHuggingFaceStore(
             model_name=config.embedding_model,
             chunk_size=config.chunk_size,
-            chunk_overlap=config.chunk_overlap
+            chunk_overlap=config.chunk_overlap,
+            quantize_embeddings=config.quantize_embeddings,
+            persist_path=config.local_store_path or None,
+            quantize_model=config.quantize_model
         )
 
 def get_storage_status() -> dict:
@@ -176,6 +212,10 @@ VECTOR_STORAGE_TYPE=local
 VECTOR_STORAGE_TYPE=qdrant_local
 QDRANT_LOCAL_URL=http://localhost:6333
 
+# Qdrant transport (gRPC by default; set to false if port 6334 is not reachable)
+QDRANT_PREFER_GRPC=true
+QDRANT_GRPC_PORT=6334
+
 # Cloud Qdrant
 VECTOR_STORAGE_TYPE=qdrant_cloud
 QDRANT_URL=https://your-cluster.qdrant.io
@@ -185,6 +225,15 @@ QDRANT_API_KEY=your-api-key
 EMBEDDING_MODEL=sentence-transformers/all-MiniLM-L6-v2
 CHUNK_SIZE=512
 CHUNK_OVERLAP=50
+QUANTIZE_EMBEDDINGS=false
+QUANTIZE_EMBEDDING_MODEL=false
+SBERT_NUM_THREADS=8
+EMBEDDING_BACKEND=torch
+LOCAL_STORE_PATH=./vector_store/local_store.pkl
+RERANK_ENABLED=false
+RERANK_MODEL=BAAI/bge-reranker-base
+RERANK_CANDIDATES=20
+RAG_LOG_LEVEL=INFO
 LOCAL_COLLECTION=arxiv_articles_local
 CLOUD_COLLECTION=arxiv_articles_cloud
 """
@@ -5,6 +5,8 @@ from contextlib import asynccontextmanager
 from typing import Dict
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer
 import os
 from datetime import datetime
@@ -13,14 +15,13 @@ from dotenv import load_dotenv
 import re
 import time
 from time import time as time_now
-from backend.app.agents import generate_content
-from backend.app.arXiv import ArxivExtractor
-from backend.app.models import (
-    GenerationRequest, 
-    GenerationResponse
-)
+from backend.app.agents import agenerate_content
+from backend.app.config import open_async_client, close_async_client
+from backend.app.arXiv import ArxivExtractor, start_text_extraction_pool, shutdown_text_extraction_pool
 from backend.app.rag_generator import RAGGenerator
-from backend.app.vector_store_config import create_vector_store, get_storage_status
+from backend.app.semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
+from backend.app.reranker import Reranker, RERANK_ENABLED
+from backend.app.vector_store_config import create_vector_store, get_storage_status, configure_torch_threads
 from .firebase_config import db
 from backend.models.prompt import PromptRequest, ImagenRequest, SimpleGenerationRequest
 from backend.services.utils import extract_stock_symbol, get_symbol_from_coin_name
@@ -44,10 +45,83 @@ from backend.services.utils import get_language_name
 env_path = Path(__file__).resolve().parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
+#Vector database (configurable storage - local, qdrant_local, or qdrant_cloud)
+# Created at startup so importing the app does not load the embedding model
+vector_store = None
+
+def init_vector_store():
+    """Creates the configured vector store, falling back to local storage"""
+    try:
+        store = create_vector_store()
+        storage_status = get_storage_status()
+        print(f"✅ Using {storage_status['current_storage']} storage")
+        return store
+    except Exception as e:
+        print(f"❌ Error creating vector store: {e}")
+        print("🔄 Falling back to local storage")
+        from app.local_vector_store import SimpleHuggingFaceStore
+        return SimpleHuggingFaceStore(
+            model_name="sentence-transformers/all-MiniLM-L6-v2",
+            chunk_size=512,
+            chunk_overlap=50
+        )
+
+# Optional cross-encoder reranker for RAG retrieval (also loaded at startup)
+reranker = None
+
+def init_reranker():
+    """Loads the cross-encoder when RERANK_ENABLED is set"""
+    if not RERANK_ENABLED:
+        return None
+    try:
+        return Reranker()
+    except Exception as e:
+        print(f"⚠️ Reranker disabled: {e}")
+        return None
+
+def retrieve_documents(query: str, top_k: int):
+    """Vector search, reranked by the cross-encoder when enabled"""
+    if reranker is None:
+        return vector_store.search(query=query, top_k=top_k, min_score=0.1)
+    
+    candidates = vector_store.search(query=query, top_k=reranker.candidate_count(top_k), min_score=0.1)
+    return reranker.rerank(query, candidates, top_k)
+
+def warmup_vector_store(store):
+    """Runs one dummy query encode so the first request does not pay for kernel selection"""
+    try:
+        store.embed_query("warmup")
+    except Exception as e:
+        print(f"⚠️ Embedding model warmup failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global vector_store, reranker
+
+    # Startup
+    # print("🚀 FastAPI application starting...")
+    # print("📖 Swagger documentation: http://localhost:8001/docs")
+    configure_torch_threads()
+    vector_store = init_vector_store()
+    warmup_vector_store(vector_store)
+    reranker = init_reranker()
+    start_text_extraction_pool()
+    open_async_client()
+    # print("✅ Application ready to work!")
+
+    yield
+
+#Shutdown
+    await close_async_client()
+    shutdown_text_extraction_pool()
+    print("🛑 Application stopping...")
+
 app = FastAPI(
     title="🤖 BUDDY API Unificada", 
     description="API completa con NLP y generación de imágenes integrada",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -57,38 +131,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    max_age=3600,  # Let browsers cache preflight responses
 )
 
 # UID validation regex
 UID_REGEX = re.compile(r"^[a-zA-Z0-9_-]{6,128}$")
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup
-    # print("🚀 FastAPI application starting...")
-    # print("📖 Swagger documentation: http://localhost:8001/docs")
-    # print("✅ Application ready to work!")
-
-    yield
-
-#Shutdown
-    print("🛑 Application stopping...")
-
-#Vector database (configurable storage - local, qdrant_local, or qdrant_cloud)
-try:
-    vector_store = create_vector_store()
-    storage_status = get_storage_status()
-    print(f"✅ Using {storage_status['current_storage']} storage")
-except Exception as e:
-    print(f"❌ Error creating vector store: {e}")
-    print("🔄 Falling back to local storage")
-    from app.local_vector_store import SimpleHuggingFaceStore
-    vector_store = SimpleHuggingFaceStore(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        chunk_size=512,
-        chunk_overlap=50
-    )
-
 # RAG generator
 groq_api_key = os.getenv("GROQ_API_KEY")
 if not groq_api_key:
@@ -98,6 +146,9 @@ if not groq_api_key:
 else:
     rag_generator = RAGGenerator(api_key=groq_api_key)
 
+# Semantic cache for RAG answers (paraphrased queries reuse previous answers)
+rag_semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
+
 @app.get("/")
 def root():
     """Root endpoint for checking server status"""
@@ -197,6 +248,10 @@ def add_articles_from_search(search_result: Dict):
         processed = vector_store.add_documents(cleaned_articles)
         print(f"✅ Processed {processed} articles")
         
+        # Cached RAG answers were built from the previous documents
+        if rag_semantic_cache is not None:
+            rag_semantic_cache.clear()
+        
         return {
             "search_metadata": {
                 "topic": search_result.get('topic', ''),
@@ -205,7 +260,7 @@ def add_articles_from_search(search_result: Dict):
             },
             "vector_results": {
                 "processed": processed,
-                "total_documents": len(vector_store.documents)
+                "total_documents": vector_store.get_statistics().get('total_documents', 0)
             }
         }
     except Exception as e:
@@ -256,7 +311,7 @@ def get_vector_store_statistics():
         raise HTTPException(status_code=500, detail=f"Error getting statistics: {str(e)}")
 
 @app.post("/rag/generate")
-def generate_rag_response(
+async def generate_rag_response(
     query: str = Query(..., description="User query for RAG generation"),
     top_k: int = Query(5, ge=1, le=10, description="Number of documents to retrieve"),
     temperature: float = Query(0.7, ge=0.0, le=2.0, description="Generation temperature"),
@@ -270,37 +325,66 @@ def generate_rag_response(
         raise HTTPException(status_code=500, detail="RAG generator not initialized. Please set GROQ_API_KEY.")
     
     try:
-        # Search in vector database
-        retrieved_docs = vector_store.search(
-            query=query,
-            top_k=top_k,
-            min_score=0.1
-        )
+        # Answer from the semantic cache when a similar query was already served
+        query_embedding = None
+        cache_namespace = f"{top_k}|{temperature}|{max_tokens}"
+        cache_generation = rag_semantic_cache.generation if rag_semantic_cache is not None else None
+        if rag_semantic_cache is not None and not stream:
+            query_embedding = await run_in_threadpool(vector_store.embed_query, query)
+            cached = rag_semantic_cache.lookup(query_embedding, namespace=cache_namespace)
+            if cached is not None:
+                print("⚡ RAG response served from semantic cache")
+                return cached
+        
+        # Search in vector database (CPU-bound, kept off the event loop)
+        retrieved_docs = await run_in_threadpool(retrieve_documents, query, top_k)
         
         if not retrieved_docs:
             print("⚠️ No relevant documents found, generating simple response")
-            response = rag_generator.generate_simple_response(
+            response = await run_in_threadpool(
+                rag_generator.generate_simple_response,
                 query=query,
                 temperature=temperature,
                 max_tokens=max_tokens
             )
             response["documents_retrieved"] = 0
+            
+            # Dropped by the cache if documents were added since retrieval
+            if query_embedding is not None and "error" not in response:
+                rag_semantic_cache.add(query_embedding, response, namespace=cache_namespace,
+                                       generation=cache_generation)
+            
             return response
         
         print(f"📚 Retrieved {len(retrieved_docs)} relevant documents")
         
-        # Generate RAG response
-        response = rag_generator.generate_rag_response(
+        if stream:
+            # Send tokens to the client as they are generated
+            return StreamingResponse(
+                rag_generator.generate_rag_response_stream(
+                    query=query,
+                    retrieved_documents=retrieved_docs,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                ),
+                media_type="text/plain; charset=utf-8"
+            )
+        
+        # Generate RAG response (awaits Groq without holding a worker thread)
+        response = await rag_generator.agenerate_rag_response(
             query=query,
             retrieved_documents=retrieved_docs,
             temperature=temperature,
-            max_tokens=max_tokens,
-            stream=stream
+            max_tokens=max_tokens
         )
         
         response["documents_retrieved"] = len(retrieved_docs)
         response["source_documents"] = retrieved_docs
         
+        if query_embedding is not None and "error" not in response:
+            rag_semantic_cache.add(query_embedding, response, namespace=cache_namespace,
+                                   generation=cache_generation)
+        
         return response
         
     except Exception as e:
@@ -406,8 +490,8 @@ async def generate_simple(req: SimpleGenerationRequest):
             topic_with_context = f"Contexto del usuario: {user_bio}\n\nTema: {req.topic}"
         
         start_time = time.time()
-        # Generar contenido usando el sistema de agentes
-        content = generate_content(
+        # Generar contenido usando el sistema de agentes (sin bloquear el event loop)
+        content = await agenerate_content(
             platform=req.platform,
             topic=topic_with_context,
             language=req.language,
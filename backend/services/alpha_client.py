@@ -8,9 +8,12 @@ load_dotenv(dotenv_path=env_path)
 
 ALPHAVANTAGE_API_KEY = os.getenv("ALPHAVANTAGE_API_KEY")
 
+# Sesión compartida: reutiliza conexiones keep-alive con Alpha Vantage
+session = requests.Session()
+
 def get_stock_data(symbol: str) -> dict:
     url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={ALPHAVANTAGE_API_KEY}"
-    r = requests.get(url)
+    r = session.get(url)
     if r.status_code == 200:
         data = r.json()
         # El dato relevante suele estar en 'Global Quote'
@@ -20,7 +23,7 @@ def get_stock_data(symbol: str) -> dict:
 def get_crypto_price(symbol: str) -> dict:
     # symbol: BTC, ETH, etc. market fijo a USD
     url = f"https://www.alphavantage.co/query?function=DIGITAL_CURRENCY_DAILY&symbol={symbol}&market=USD&apikey={ALPHAVANTAGE_API_KEY}"
-    r = requests.get(url)
+    r = session.get(url)
     if r.status_code == 200:
         data = r.json()
         # El dato está en "Time Series (Digital Currency Daily)" el último registro
@@ -35,7 +38,7 @@ def get_crypto_price(symbol: str) -> dict:
 
 def get_forex_rate(from_currency: str, to_currency: str) -> dict:
     url = f"https://www.alphavantage.co/query?function=CURRENCY_EXCHANGE_RATE&from_currency={from_currency}&to_currency={to_currency}&apikey={ALPHAVANTAGE_API_KEY}"
-    r = requests.get(url)
+    r = session.get(url)
     if r.status_code == 200:
         data = r.json()
         rate_info = data.get("Realtime Currency Exchange Rate", {})
@@ -0,0 +1,208 @@
+"""
+Tests for SimpleHuggingFaceStore: snapshot swapping, dedup and incremental TF-IDF
+Run from the repository root: python -m pytest
+"""
+
+import importlib.util
+import sys
+import threading
+import types
+import zlib
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfTransformer
+
+# The encoder is replaced by HashingEncoder below, so the real package is not needed to run these tests
+if importlib.util.find_spec("sentence_transformers") is None:
+    stub = types.ModuleType("sentence_transformers")
+    stub.SentenceTransformer = None
+    sys.modules["sentence_transformers"] = stub
+
+from backend.app import local_vector_store
+from backend.app.local_vector_store import SimpleHuggingFaceStore
+
+WORDS = ("quantum", "neural", "network", "graph", "entropy", "photon", "lattice", "gradient",
+         "spin", "qubit", "kernel", "tensor", "boson", "manifold", "sampling", "inference")
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words encoder standing in for the SentenceTransformer"""
+
+    dim = 32
+
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=False,
+               show_progress_bar=False):
+        if self.fail:
+            raise RuntimeError("encoder failure")
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.full((len(texts), self.dim), 1e-3, dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                # Signed hashing, so unrelated texts can have low or negative similarity
+                digest = zlib.crc32(word.encode("utf-8"))
+                vectors[row, digest % self.dim] += 1.0 if digest & 0x10000 else -1.0
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if single else vectors
+
+
+def make_documents(count, start=0, seed=0):
+    """arXiv-like documents with enough text to be split into several fragments"""
+    rng = np.random.default_rng(seed)
+    documents = []
+    for i in range(start, start + count):
+        sentences = [" ".join(rng.choice(WORDS, size=8)) + "." for _ in range(6)]
+        documents.append({
+            'title': f"Paper {i}",
+            'arxiv_id': f"2401.{i:05d}",
+            'authors': [f"Author {i}"],
+            'full_text': " ".join(sentences)
+        })
+    return documents
+
+
+@pytest.fixture
+def make_store(monkeypatch, tmp_path):
+    """Builds stores that use HashingEncoder instead of downloading a model"""
+    def load_model(store):
+        store.model = HashingEncoder()
+        store._reset_query_cache()
+
+    monkeypatch.setattr(SimpleHuggingFaceStore, "_load_model", load_model)
+
+    def factory(**kwargs):
+        return SimpleHuggingFaceStore(cache_dir=str(tmp_path / "hf_cache"), chunk_size=120, chunk_overlap=20,
+                                      **kwargs)
+
+    return factory
+
+
+def test_search_during_add_sees_consistent_snapshots(make_store):
+    store = make_store()
+    store.add_documents(make_documents(5))
+
+    errors = []
+    writer_done = threading.Event()
+
+    def writer():
+        try:
+            for batch in range(20):
+                store.add_documents(make_documents(5, start=5 + batch * 5, seed=batch + 1))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            writer_done.set()
+
+    def reader(query):
+        try:
+            while not writer_done.is_set():
+                for result in store.search(query, top_k=5, min_score=0.0):
+                    # Fragment and document lists must come from the same snapshot
+                    assert result['original_title'] == result['title']
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader, args=(word,)) for word in WORDS[:4]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    stats = store.get_statistics()
+    assert stats['total_documents'] == 105
+    assert store.embeddings.shape[0] == stats['total_fragments'] == store.tfidf_matrix.shape[0]
+
+
+def test_failed_encode_leaves_index_and_dedup_state_unchanged(make_store):
+    store = make_store()
+    store.add_documents(make_documents(3))
+    index_before = store._index
+    seen_before = set(store._seen_keys)
+
+    new_documents = make_documents(2, start=3, seed=1)
+    store.model = HashingEncoder(fail=True)
+    with pytest.raises(RuntimeError):
+        store.add_documents(new_documents)
+
+    assert store._index is index_before
+    assert store._seen_keys == seen_before
+
+    # The documents are not treated as duplicates once encoding works again
+    store.model = HashingEncoder()
+    assert store.add_documents(new_documents) == 5
+
+
+def test_duplicates_within_a_batch_are_skipped(make_store):
+    store = make_store()
+    documents = make_documents(2)
+    assert store.add_documents(documents + [dict(documents[0])]) == 2
+    assert store.add_documents(documents) == 2
+
+
+def test_vector_search_ranks_by_enhanced_score_over_all_fragments(make_store):
+    store = make_store()
+    # Row 4 has the lowest cosine but a first fragment of medium length, so it wins after enhancement
+    cosines = [0.60, 0.59, 0.58, 0.57, 0.56]
+    fragments = [{'original_doc_index': i, 'fragment_index': 0 if i == 4 else 1, 'fragment_text': f"row {i}",
+                  'title': f"Paper {i}", 'fragment_length': 500 if i == 4 else 50} for i in range(len(cosines))]
+    documents = [{'title': f"Paper {i}"} for i in range(len(cosines))]
+    emb_matrix = np.zeros((len(cosines), HashingEncoder.dim), dtype=np.float32)
+    emb_matrix[:, 0] = cosines
+    emb_matrix[:, 1] = np.sqrt(1 - np.square(cosines))
+    index = local_vector_store._FragmentIndex(documents, fragments, emb_matrix)
+    query_embedding = np.eye(HashingEncoder.dim, dtype=np.float32)[0]
+
+    results = store._vector_search(index, query_embedding, top_k=1, min_score=0.0)
+    assert [r['fragment_text'] for r in results] == ["row 4"]
+
+
+def test_quantized_store_keeps_int8_codes_and_ranks_like_float32(make_store, tmp_path):
+    documents = make_documents(30)
+    exact = make_store()
+    exact.add_documents(documents)
+    quantized = make_store(quantize_embeddings=True)
+    quantized.add_documents(documents[:10])
+    quantized.add_documents(documents[10:])
+
+    assert quantized.embeddings.dtype == np.int8
+    assert quantized.embeddings.nbytes * 4 == exact.embeddings.nbytes
+
+    for query in WORDS:
+        for use_hybrid in (True, False):
+            expected = exact.search(query, top_k=5, use_hybrid=use_hybrid, min_score=0.0)
+            results = quantized.search(query, top_k=5, use_hybrid=use_hybrid, min_score=0.0)
+            assert [r['score'] for r in results] == pytest.approx([r['score'] for r in expected], abs=0.01)
+
+    # A store saved unquantized is converted on load
+    exact.save(str(tmp_path / "store.pkl"))
+    quantized.load(str(tmp_path / "store.pkl"))
+    assert quantized.embeddings.dtype == np.int8
+    assert quantized.embeddings.shape == exact.embeddings.shape
+
+
+def test_incremental_tfidf_matches_full_refit(make_store):
+    documents = make_documents(12)
+
+    incremental = make_store()
+    incremental.add_documents(documents[:5])
+    incremental.add_documents(documents[5:9])
+    incremental.add_documents(documents[9:])
+
+    full = make_store()
+    full.add_documents(documents)
+
+    texts = [fragment['fragment_text'] for fragment in incremental.fragments]
+    refit = TfidfTransformer().fit_transform(incremental._term_vectorizer.transform(texts))
+
+    np.testing.assert_allclose(incremental.tfidf_matrix.toarray(), refit.toarray(), atol=1e-12)
+    np.testing.assert_allclose(incremental.tfidf_matrix.toarray(), full.tfidf_matrix.toarray(), atol=1e-12)
+
+    for query in ("quantum qubit", "neural network gradient", "lattice boson spin"):
+        assert ([(r['fragment_text'], r['score']) for r in incremental.search(query, top_k=5, min_score=0.0)] ==
+                [(r['fragment_text'], r['score']) for r in full.search(query, top_k=5, min_score=0.0)])